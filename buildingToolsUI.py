@@ -1,666 +1,819 @@
 # -*- coding: utf-8 -*-
 """Unified UI for the instance placement helper scripts."""
 
-import maya.cmds as cmds
+from collections import namedtuple
+from functools import lru_cache, partial
 
-import instanceArray
-import instanceChain
-import instanceRadial
-import instanceUtilities
+import maya.cmds as cmds
+import maya.mel as mel
 
 
 WINDOW_NAME = "buildingToolsWin"
 
 OPTION_VAR_PREFIX = "buildingToolsUI_"
 _UI_CONTROLS = {}
+# Set by the changeCommand of every persisted control; save_prefs skips
+# writing when nothing changed since the last save.
+_PREFS_DIRTY = False
+# Value last written to (or read from) each optionVar, keyed by pref key,
+# so save_prefs only rewrites the ones that differ.
+_LAST_SAVED = {}
+# Number of items in each option menu, filled while the window is built.
+_MENU_COUNTS = {}
+
+_ORIENT = ("none", "aim", "copy")
+_AXES = ("x", "y", "z")
+_SORT_AXES = ("auto", "x", "y", "z")
+_CHAIN_PARENT_LABELS = (u"なし (ワールド)", u"左ノードと同じ", u"指定ノード")
+# Index of the "指定ノード" item in the chain parent menu.
+_CHAIN_PARENT_NODE_INDEX = 3
+_SORT_AXIS_LABELS = (u"自動", "X", "Y", "Z")
+# Indexed by the descending flag.
+_SORT_ORDER_LABELS = (u"昇順", u"降順")
+
+# Layout and button colors shared by every tab.
+_COL_ATTACH = ("both", 8)
+_CW_LABEL = ((1, 100),)
+_CW_FIELD = ((1, 100), (2, 60))
+_CW_WIDE_FIELD = ((1, 100), (2, 80))
+_CW_CHAIN_LABEL = ((1, 110),)
+_CW_CHAIN_FIELD = ((1, 110), (2, 60))
+_CW_CHAIN_WIDE_FIELD = ((1, 110), (2, 80))
+_BTN_GREEN = (0.6, 0.8, 0.6)
+_BTN_LIGHT_GREEN = (0.7, 0.9, 0.7)
+_BTN_BLUE = (0.6, 0.7, 0.9)
+_BTN_LAVENDER = (0.7, 0.7, 0.95)
+_BTN_ORANGE = (0.9, 0.7, 0.6)
+_BTN_RED = (0.95, 0.6, 0.6)
+_BTN_GRAY = (0.8, 0.8, 0.8)
+
+_SUCCESS_SPAN = u"<span style='color:#b0ffb0'>{}</span>"
+_ERROR_SPAN = u"<span style='color:#ffaaaa'>{}</span>"
+
+_MSG_CREATED = u"%d 個のインスタンスを作成しました。"
+_MSG_REPLACED = u"%d 個のオブジェクトを置換しました。"
+_MSG_MIRRORED = u"%d 個のインスタンスをミラーしました。"
+_MSG_MADE_UNIQUE = u"%d 個のインスタンスを解除しました。"
+_MSG_COMBINED = u"%d 個のインスタンスを解除し、%s に結合しました。"
+_MSG_COMBINE_UPDATED = u"インスタンスを解除し、%s を更新しました。"
+_MSG_SORTED = u"%d 個のオブジェクトを %s (%s) で並べ替えました。"
+_MSG_SAVED = u"設定を保存しました。"
+
+
+# Persisted controls and how each one is read/restored.
+PREF_SPECS = (
+    ("array_count", "int"),
+    ("array_include_end", "bool"),
+    ("array_orient", "menu"),
+    ("array_parent", "bool"),
+    ("array_alternate_scale", "bool"),
+    ("array_alternate_scale_axis", "menu"),
+    ("chain_count", "int"),
+    ("chain_parent_mode", "menu"),
+    ("chain_parent_target", "text"),
+    ("chain_orient", "menu"),
+    ("radial_count", "int"),
+    ("radial_axis", "menu"),
+)
+
+
+@lru_cache(maxsize=32)
+def _option_var_name(key):
+    return OPTION_VAR_PREFIX + key
 
 
-def _option_var_name(key):
-    return f"{OPTION_VAR_PREFIX}{key}"
+def _mel_quote(text):
+    """Return *text* as a double-quoted MEL string literal."""
+    text = (text or u"").replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return u'"%s"' % text
 
 
-def load_prefs():
-    """Restore previously saved UI values from Maya's optionVar."""
-    if not _UI_CONTROLS:
-        return
+def _safe_int(value, default=None):
+    """Return *value* as an int, or *default* when it cannot be converted.
 
-    controls = _UI_CONTROLS
+    The int/bool/menu prefs are written with -iv, so optionVar normally hands
+    back an int; only values edited by hand need converting.
+    """
+    if isinstance(value, int):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
 
-    def _get_option(key):
-        option_name = _option_var_name(key)
-        if cmds.optionVar(exists=option_name):
-            return cmds.optionVar(q=option_name)
-        return None
 
-    value = _get_option("array_count")
+def _restore_int(control, value):
+    value = _safe_int(value)
     if value is not None:
-        try:
-            cmds.intFieldGrp(controls["array_count"], e=True, value1=int(value))
-        except (TypeError, ValueError):
-            pass
+        cmds.intFieldGrp(control, e=True, value1=value)
 
-    value = _get_option("array_include_end")
-    if value is not None:
-        try:
-            cmds.checkBox(controls["array_include_end"], e=True, value=bool(int(value)))
-        except (TypeError, ValueError):
-            pass
 
-    value = _get_option("array_orient")
+def _restore_bool(control, value):
+    value = _safe_int(value)
     if value is not None:
-        try:
-            index = int(value)
-        except (TypeError, ValueError):
-            index = None
-        if index is not None:
-            num_items = cmds.optionMenuGrp(controls["array_orient"], q=True, numberOfItems=True)
-            index = max(1, min(num_items, index))
-            cmds.optionMenuGrp(controls["array_orient"], e=True, select=index)
-
-    value = _get_option("array_parent")
-    if value is not None:
-        try:
-            cmds.checkBox(controls["array_parent"], e=True, value=bool(int(value)))
-        except (TypeError, ValueError):
-            pass
-
-    value = _get_option("array_alternate_scale")
-    if value is not None and "array_alternate_scale" in controls:
-        try:
-            enabled = bool(int(value))
-        except (TypeError, ValueError):
-            enabled = False
-        cmds.checkBox(controls["array_alternate_scale"], e=True, value=enabled)
-
-    value = _get_option("array_alternate_scale_axis")
-    if value is not None and "array_alternate_scale_axis" in controls:
-        try:
-            index = int(value)
-        except (TypeError, ValueError):
-            index = None
-        if index is not None:
-            num_items = cmds.optionMenuGrp(
-                controls["array_alternate_scale_axis"], q=True, numberOfItems=True
-            )
-            index = max(1, min(num_items, index))
-            cmds.optionMenuGrp(
-                controls["array_alternate_scale_axis"], e=True, select=index
-            )
-
-    value = _get_option("chain_count")
-    if value is not None:
-        try:
-            cmds.intFieldGrp(controls["chain_count"], e=True, value1=int(value))
-        except (TypeError, ValueError):
-            pass
+        cmds.checkBox(control, e=True, value=bool(value))
 
-    value = _get_option("chain_parent_mode")
-    if value is not None:
-        try:
-            index = int(value)
-        except (TypeError, ValueError):
-            index = None
-        if index is not None:
-            num_items = cmds.optionMenuGrp(controls["chain_parent_mode"], q=True, numberOfItems=True)
-            index = max(1, min(num_items, index))
-            cmds.optionMenuGrp(controls["chain_parent_mode"], e=True, select=index)
-
-    value = _get_option("chain_parent_target")
-    if value is not None:
-        cmds.textFieldGrp(controls["chain_parent_target"], e=True, text=value)
 
-    value = _get_option("chain_orient")
-    if value is not None:
-        try:
-            index = int(value)
-        except (TypeError, ValueError):
-            index = None
-        if index is not None:
-            num_items = cmds.optionMenuGrp(controls["chain_orient"], q=True, numberOfItems=True)
-            index = max(1, min(num_items, index))
-            cmds.optionMenuGrp(controls["chain_orient"], e=True, select=index)
-
-    value = _get_option("radial_count")
-    if value is not None:
-        try:
-            cmds.intFieldGrp(controls["radial_count"], e=True, value1=int(value))
-        except (TypeError, ValueError):
-            pass
+def _restore_menu(control, value):
+    index = _safe_int(value)
+    if index is None:
+        return
+    num_items = _MENU_COUNTS.get(control)
+    if num_items is None:
+        num_items = cmds.optionMenuGrp(control, q=True, numberOfItems=True)
+    index = max(1, min(num_items, index))
+    cmds.optionMenuGrp(control, e=True, select=index)
 
-    value = _get_option("radial_axis")
-    if value is not None:
-        try:
-            index = int(value)
-        except (TypeError, ValueError):
-            index = None
-        if index is not None:
-            num_items = cmds.optionMenuGrp(controls["radial_axis"], q=True, numberOfItems=True)
-            index = max(1, min(num_items, index))
-            cmds.optionMenuGrp(controls["radial_axis"], e=True, select=index)
+
+def _restore_text(control, value):
+    cmds.textFieldGrp(control, e=True, text=value)
+
+
+def _read_int(control):
+    return "iv", int(cmds.intFieldGrp(control, q=True, value1=True))
+
+
+def _read_bool(control):
+    return "iv", int(bool(cmds.checkBox(control, q=True, value=True)))
+
+
+def _read_menu(control):
+    return "iv", int(cmds.optionMenuGrp(control, q=True, select=True))
+
+
+def _read_text(control):
+    return "sv", cmds.textFieldGrp(control, q=True, text=True)
+
+
+_PREF_RESTORERS = {
+    "int": _restore_int,
+    "bool": _restore_bool,
+    "menu": _restore_menu,
+    "text": _restore_text,
+}
+_PREF_READERS = {
+    "int": _read_int,
+    "bool": _read_bool,
+    "menu": _read_menu,
+    "text": _read_text,
+}
+
+
+def load_prefs():
+    """Restore previously saved UI values from Maya's optionVar.
+
+    Returns:
+        set[str]: Keys from PREF_SPECS whose control was restored.
+    """
+    restored = set()
+    if not _UI_CONTROLS:
+        return restored
+
+    controls = _UI_CONTROLS
+    option_var = cmds.optionVar
+    restorers = _PREF_RESTORERS
+    existing = set(option_var(list=True) or [])
+    if not any(name.startswith(OPTION_VAR_PREFIX) for name in existing):
+        # Nothing saved yet; the controls already hold their defaults.
+        return restored
+
+    for key, kind in PREF_SPECS:
+        option_name = _option_var_name(key)
+        if option_name not in existing:
+            continue
+        value = option_var(q=option_name)
+        restorers[kind](controls[key], value)
+        restored.add(key)
+        _LAST_SAVED[key] = value if kind == "text" else _safe_int(value)
 
     # Ensure the chain parent target field has the correct enabled state.
-    chain_parent_label = cmds.optionMenuGrp(controls["chain_parent_mode"], q=True, value=True)
-    cmds.textFieldGrp(
-        controls["chain_parent_target"],
-        e=True,
-        enable=chain_parent_label == u"指定ノード",
-    )
+    if "chain_parent_mode" in restored:
+        parent_idx = cmds.optionMenuGrp(controls["chain_parent_mode"], q=True, select=True)
+        cmds.textFieldGrp(
+            controls["chain_parent_target"],
+            e=True,
+            enable=parent_idx == _CHAIN_PARENT_NODE_INDEX,
+        )
+    return restored
+
+
+def _flush_option_vars(pairs):
+    """Write optionVars with a single ``optionVar`` command.
+
+    The -iv/-sv flags are multi-use, so every pair becomes another flag on
+    the same command instead of a separate statement.
+
+    Args:
+        pairs (list[tuple]): ``(name, flag, value)`` tuples where flag is
+            ``"iv"`` or ``"sv"``.
+    """
+    if not pairs:
+        return
+    flags = []
+    for name, flag, value in pairs:
+        if flag == "sv":
+            value = _mel_quote(value)
+        flags.append(u' -%s "%s" %s' % (flag, name, value))
+    mel.eval(u"optionVar%s;" % u"".join(flags))
 
 
 def save_prefs():
     """Persist current UI values via Maya's optionVar."""
-    if not _UI_CONTROLS:
+    global _PREFS_DIRTY
+    if not _UI_CONTROLS or not _PREFS_DIRTY:
         return
 
     controls = _UI_CONTROLS
+    readers = _PREF_READERS
+    last_saved = _LAST_SAVED
+    pairs = []
+    changed = {}
+    for key, kind in PREF_SPECS:
+        flag, value = readers[kind](controls[key])
+        if key in last_saved and last_saved[key] == value:
+            continue
+        pairs.append((_option_var_name(key), flag, value))
+        changed[key] = value
+    _flush_option_vars(pairs)
+    last_saved.update(changed)
+    _PREFS_DIRTY = False
 
-    cmds.optionVar(
-        iv=(
-            _option_var_name("array_count"),
-            int(cmds.intFieldGrp(controls["array_count"], q=True, value1=True)),
-        )
-    )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("array_include_end"),
-            int(bool(cmds.checkBox(controls["array_include_end"], q=True, value=True))),
-        )
-    )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("array_orient"),
-            int(cmds.optionMenuGrp(controls["array_orient"], q=True, select=True)),
-        )
-    )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("array_parent"),
-            int(bool(cmds.checkBox(controls["array_parent"], q=True, value=True))),
-        )
-    )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("array_alternate_scale"),
-            int(
-                bool(
-                    cmds.checkBox(
-                        controls["array_alternate_scale"], q=True, value=True
-                    )
-                )
-            ),
-        )
-    )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("array_alternate_scale_axis"),
-            int(
-                cmds.optionMenuGrp(
-                    controls["array_alternate_scale_axis"], q=True, select=True
-                )
-            ),
-        )
+
+def _mark_dirty(*_):
+    global _PREFS_DIRTY
+    _PREFS_DIRTY = True
+
+
+def _with_dirty(callback):
+    """Wrap a changeCommand so it also marks the prefs as dirty."""
+    def _callback(*args):
+        _mark_dirty()
+        return callback(*args)
+    return _callback
+
+
+def _add_menu_items(menu, labels):
+    """Add a menuItem for each label to the current option *menu*.
+
+    The item count is remembered so load_prefs can clamp indices without
+    querying the menu.
+    """
+    menu_item = cmds.menuItem
+    for label in labels:
+        menu_item(label=label)
+    _MENU_COUNTS[menu] = len(labels)
+
+
+def _make_enable_toggle(controls, key):
+    """Return a checkBox changeCommand that enables the textFieldGrp ``controls[key]``.
+
+    The control is looked up when the command runs, so the toggle can be
+    attached before the target widget is created.
+    """
+    return lambda value: cmds.textFieldGrp(controls[key], e=True, enable=value)
+
+
+def _make_menu_enable_toggle(controls, key):
+    """Return a checkBox changeCommand that enables the optionMenuGrp ``controls[key]``."""
+    return lambda value: cmds.optionMenuGrp(controls[key], e=True, enable=value)
+
+
+def _show_message(span, message):
+    # Let the button callback return first; the HUD draws on the next idle tick.
+    cmds.evalDeferred(
+        partial(cmds.inViewMessage, amg=span.format(message), pos="midCenter", fade=True),
+        lowestPriority=True,
     )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("chain_count"),
-            int(cmds.intFieldGrp(controls["chain_count"], q=True, value1=True)),
+
+
+def _show_error(message):
+    _show_message(_ERROR_SPAN, message)
+
+
+def _show_success(message):
+    _show_message(_SUCCESS_SPAN, message)
+
+
+_ArraySettings = namedtuple(
+    "_ArraySettings",
+    (
+        "spec_mode",
+        "count",
+        "spacing",
+        "bbox_axis_idx",
+        "alternate_scale",
+        "alternate_axis_idx",
+        "include_end",
+        "orient_idx",
+        "parent",
+        "group_name",
+    ),
+)
+_ChainSettings = namedtuple(
+    "_ChainSettings",
+    ("spec_mode", "count", "spacing", "parent_idx", "parent_target", "orient_idx", "group_name"),
+)
+_RadialSettings = namedtuple("_RadialSettings", ("count", "radius", "axis_idx", "group_name"))
+
+
+def _query_group_name(group_checkbox, group_name_field):
+    """Return the group name requested by a tab, or None when grouping is off."""
+    if not cmds.checkBox(group_checkbox, q=True, value=True):
+        return None
+    return cmds.textFieldGrp(group_name_field, q=True, text=True).strip()
+
+
+def _snapshot_array_controls(controls):
+    """Query every Line tab control once and return the values."""
+    mode = cmds.optionMenuGrp(controls["array_spec_mode"], q=True, select=True)
+    spacing = None
+    if mode == 2:
+        spacing = cmds.floatFieldGrp(controls["array_spacing"], q=True, value1=True)
+    bbox_axis_idx = None
+    if mode in (3, 4):
+        bbox_axis_idx = cmds.optionMenuGrp(controls["array_bbox_axis"], q=True, select=True)
+    alternate_scale = cmds.checkBox(controls["array_alternate_scale"], q=True, value=True)
+    alternate_axis_idx = None
+    if alternate_scale:
+        alternate_axis_idx = cmds.optionMenuGrp(
+            controls["array_alternate_scale_axis"], q=True, select=True
         )
+    return _ArraySettings(
+        spec_mode=mode,
+        count=cmds.intFieldGrp(controls["array_count"], q=True, value1=True),
+        spacing=spacing,
+        bbox_axis_idx=bbox_axis_idx,
+        alternate_scale=alternate_scale,
+        alternate_axis_idx=alternate_axis_idx,
+        include_end=cmds.checkBox(controls["array_include_end"], q=True, value=True),
+        orient_idx=cmds.optionMenuGrp(controls["array_orient"], q=True, select=True),
+        parent=cmds.checkBox(controls["array_parent"], q=True, value=True),
+        group_name=_query_group_name(controls["array_group"], controls["array_group_name"]),
     )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("chain_parent_mode"),
-            int(cmds.optionMenuGrp(controls["chain_parent_mode"], q=True, select=True)),
-        )
+
+
+def _snapshot_chain_controls(controls):
+    """Query every Chain tab control once and return the values."""
+    mode = cmds.optionMenuGrp(controls["chain_spec_mode"], q=True, select=True)
+    spacing = None
+    if mode == 2:
+        spacing = cmds.floatFieldGrp(controls["chain_spacing"], q=True, value1=True)
+    parent_idx = cmds.optionMenuGrp(controls["chain_parent_mode"], q=True, select=True)
+    parent_target = None
+    if parent_idx not in (1, 2):
+        parent_target = cmds.textFieldGrp(controls["chain_parent_target"], q=True, text=True)
+    return _ChainSettings(
+        spec_mode=mode,
+        count=cmds.intFieldGrp(controls["chain_count"], q=True, value1=True),
+        spacing=spacing,
+        parent_idx=parent_idx,
+        parent_target=parent_target,
+        orient_idx=cmds.optionMenuGrp(controls["chain_orient"], q=True, select=True),
+        group_name=_query_group_name(controls["chain_group"], controls["chain_group_name"]),
     )
-    cmds.optionVar(
-        sv=(
-            _option_var_name("chain_parent_target"),
-            cmds.textFieldGrp(controls["chain_parent_target"], q=True, text=True),
-        )
+
+
+def _snapshot_radial_controls(controls):
+    """Query every Radial tab control once and return the values."""
+    return _RadialSettings(
+        count=cmds.intFieldGrp(controls["radial_count"], q=True, value1=True),
+        radius=cmds.intFieldGrp(controls["radial_radius"], q=True, value1=True),
+        axis_idx=cmds.optionMenuGrp(controls["radial_axis"], q=True, select=True),
+        group_name=_query_group_name(controls["radial_group"], controls["radial_group_name"]),
     )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("chain_orient"),
-            int(cmds.optionMenuGrp(controls["chain_orient"], q=True, select=True)),
+
+
+def _exec_array(controls, *_):
+    try:
+        import instanceArray
+        settings = _snapshot_array_controls(controls)
+        orient_value = _ORIENT[settings.orient_idx - 1]
+        mode = settings.spec_mode
+        use_bbox_spacing = mode in (3, 4)
+        bbox_count_mode_flag = mode == 4
+        bbox_axis_value = "x"
+        if use_bbox_spacing:
+            axis_idx = max(1, min(3, _safe_int(settings.bbox_axis_idx, 1)))
+            bbox_axis_value = _AXES[axis_idx - 1]
+        alternate_axis_value = "x"
+        if settings.alternate_scale:
+            alt_axis_idx = max(1, min(3, _safe_int(settings.alternate_axis_idx, 1)))
+            alternate_axis_value = _AXES[alt_axis_idx - 1]
+        result = instanceArray.instance_child_between_parent(
+            count=settings.count,
+            include_end=settings.include_end,
+            orient=orient_value,
+            parent_instances_to_parent=settings.parent,
+            group_name=settings.group_name,
+            spacing=settings.spacing,
+            use_bbox_spacing=use_bbox_spacing,
+            bbox_axis=bbox_axis_value,
+            alternate_scale=settings.alternate_scale,
+            alternate_scale_axis=alternate_axis_value,
+            bbox_count_mode=bbox_count_mode_flag,
         )
-    )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("radial_count"),
-            int(cmds.intFieldGrp(controls["radial_count"], q=True, value1=True)),
+        if result:
+            _show_success(_MSG_CREATED % len(result))
+    except RuntimeError as exc:
+        _show_error(str(exc))
+        raise
+
+
+def _exec_chain(controls, *_):
+    try:
+        import instanceChain
+        settings = _snapshot_chain_controls(controls)
+        orient_value = _ORIENT[settings.orient_idx - 1]
+        if settings.parent_idx == 1:
+            parent_mode = None
+        elif settings.parent_idx == 2:
+            parent_mode = "same"
+        else:
+            parent_mode = settings.parent_target.strip() or None
+        result = instanceChain.instance_between_chain(
+            per_segment=settings.count,
+            parent_instances_to=parent_mode,
+            orient=orient_value,
+            group_name=settings.group_name,
+            spacing=settings.spacing,
         )
-    )
-    cmds.optionVar(
-        iv=(
-            _option_var_name("radial_axis"),
-            int(cmds.optionMenuGrp(controls["radial_axis"], q=True, select=True)),
+        if result:
+            _show_success(_MSG_CREATED % len(result))
+    except RuntimeError as exc:
+        _show_error(str(exc))
+        raise
+
+
+def _exec_radial(controls, *_):
+    try:
+        import instanceRadial
+        settings = _snapshot_radial_controls(controls)
+        axis_value = _AXES[settings.axis_idx - 1]
+        result = instanceRadial.create_instance_circle_with_rotation(
+            num_instances=settings.count,
+            axis=axis_value,
+            group_name=settings.group_name,
+            radius=settings.radius,
         )
-    )
+        if result:
+            _show_success(_MSG_CREATED % len(result))
+    except RuntimeError as exc:
+        _show_error(str(exc))
+        raise
 
 
-def _show_error(message):
-    cmds.inViewMessage(amg=f"<span style='color:#ffaaaa'>{message}</span>", pos="midCenter", fade=True)
+def _exec_replace(*_):
+    try:
+        import instanceUtilities
+        result = instanceUtilities.replace_with_first_instance()
+        if result:
+            _show_success(_MSG_REPLACED % len(result))
+    except RuntimeError as exc:
+        _show_error(str(exc))
+        raise
+
+
+def _exec_mirror(*_):
+    try:
+        import instanceUtilities
+        result = instanceUtilities.mirror_selected_instances()
+        if result:
+            _show_success(_MSG_MIRRORED % len(result))
+    except RuntimeError as exc:
+        _show_error(str(exc))
+        raise
+
+
+def _exec_make_unique(*_):
+    import instanceUtilities
+    result = instanceUtilities.make_selected_unique()
+    if result:
+        _show_success(_MSG_MADE_UNIQUE % len(result))
+
+
+def _exec_combine(controls, *_):
+    import instanceUtilities
+    distance_value = cmds.floatFieldGrp(controls["combine_merge_distance"], q=True, value1=True)
+    result = instanceUtilities.make_unique_combine_merge(merge_distance=distance_value)
+    if result:
+        combined_node, source_count = result
+        short_name = combined_node.rpartition("|")[2] if combined_node else combined_node
+        if source_count > 1:
+            message = _MSG_COMBINED % (source_count, short_name)
+        else:
+            message = _MSG_COMBINE_UPDATED % short_name
+        _show_success(message)
+
+
+def _exec_sort(controls, *_):
+    import instanceUtilities
+    axis_idx = cmds.optionMenuGrp(controls["util_sort_axis"], q=True, select=True)
+    axis_value = _SORT_AXES[axis_idx - 1]
+    descending = cmds.checkBox(controls["util_sort_desc"], q=True, value=True)
+    try:
+        result = instanceUtilities.sort_selected_by_position(axis=axis_value, descending=descending)
+        if result:
+            axis_label = _SORT_AXIS_LABELS[axis_idx - 1]
+            order_label = _SORT_ORDER_LABELS[bool(descending)]
+            _show_success(_MSG_SORTED % (len(result), axis_label, order_label))
+    except RuntimeError as exc:
+        _show_error(str(exc))
+        raise
+
+
+def show_ui(force_rebuild=False):
+    """Display the Building Tools UI window.
+
+    The window is retained when closed, so later calls simply show the
+    existing window again instead of rebuilding every control.
 
+    Args:
+        force_rebuild (bool): Delete and rebuild the window even if it exists.
 
-def show_ui():
-    """Display the Building Tools UI window."""
-    global _UI_CONTROLS
+    Returns:
+        str: Name of the window.
+    """
     if cmds.window(WINDOW_NAME, exists=True):
+        if _UI_CONTROLS and not force_rebuild:
+            cmds.showWindow(WINDOW_NAME)
+            return WINDOW_NAME
         save_prefs()
         cmds.deleteUI(WINDOW_NAME)
-        _UI_CONTROLS = {}
+        _UI_CONTROLS.clear()
+        _MENU_COUNTS.clear()
+
+    # Suspend redraws while the controls are created one by one.
+    cmds.refresh(suspend=True)
+    try:
+        cmds.waitCursor(state=True)
+        win = _build_window()
+    except Exception:
+        # A half-filled dict would make the next show_ui reuse a broken window.
+        _UI_CONTROLS.clear()
+        raise
+    finally:
+        # Resume refresh first so a failing cursor call cannot leave it suspended.
+        cmds.refresh(suspend=False)
+        cmds.waitCursor(state=False)
 
-    win = cmds.window(WINDOW_NAME, title=u"Building Tools", sizeable=False)
-    cmds.columnLayout(adj=True, rowSpacing=8, columnAttach=("both", 8))
+    cmds.showWindow(win)
+    return win
+
+
+def rebuild_ui():
+    """Delete the Building Tools window and build a fresh one.
+
+    Returns:
+        str: Name of the window.
+    """
+    return show_ui(force_rebuild=True)
+
+
+def _reset_ui(*_):
+    """Rebuild the window from scratch once the menu callback has returned."""
+    cmds.evalDeferred(rebuild_ui)
+
+
+def _build_window():
+    """Create the window and every control, returning the window name."""
+    # Callbacks are bound to the module dict, which is filled as each
+    # control is created.
+    controls = _UI_CONTROLS
+    controls.clear()
+
+    win = cmds.window(
+        WINDOW_NAME,
+        title=u"Building Tools",
+        sizeable=False,
+        retain=True,
+        menuBar=True,
+    )
+    cmds.menu(label=u"編集")
+    cmds.menuItem(label=u"UIをリセット", command=_reset_ui)
+    cmds.columnLayout(adj=True, rowSpacing=8, columnAttach=_COL_ATTACH)
     tabs = cmds.tabLayout(innerMarginWidth=8, innerMarginHeight=8)
 
     # ------------------------------------------------------------------
     # Array tab
     # ------------------------------------------------------------------
-    array_tab = cmds.columnLayout(adj=True, rowSpacing=6, columnAttach=("both", 8))
+    array_tab = cmds.columnLayout(adj=True, rowSpacing=6, columnAttach=_COL_ATTACH)
     cmds.text(
         label=u"選択：親(始点) → 子(終点)\n※ バウンディングボックス（個数）は子のみで実行可能",
         align="left",
     )
-    array_spec_mode = cmds.optionMenuGrp(
+    # Last applied state per toggle so reselecting the same item skips the edits.
+    last_array_mode = [None]
+    last_chain_spacing = [None]
+
+    def on_array_spec_mode_changed(*_):
+        mode = cmds.optionMenuGrp(array_spec_mode, q=True, select=True)
+        if mode == last_array_mode[0]:
+            return
+        last_array_mode[0] = mode
+        use_spacing = mode == 2
+        use_bbox_distance = mode == 3
+        use_bbox_count = mode == 4
+        cmds.intFieldGrp(array_count, e=True, enable=(mode in (1, 4)))
+        cmds.floatFieldGrp(array_spacing, e=True, enable=use_spacing)
+        cmds.optionMenuGrp(
+            array_bbox_axis,
+            e=True,
+            enable=(use_bbox_distance or use_bbox_count),
+        )
+
+    array_spec_mode = controls["array_spec_mode"] = cmds.optionMenuGrp(
         label=u"指定方法",
-        columnWidth=[(1, 100)],
+        columnWidth=_CW_LABEL,
+        changeCommand=on_array_spec_mode_changed,
+    )
+    _add_menu_items(
+        array_spec_mode,
+        (u"個数指定", u"距離指定", u"バウンディングボックス（距離）", u"バウンディングボックス（個数）"),
     )
-    cmds.menuItem(label=u"個数指定")
-    cmds.menuItem(label=u"距離指定")
-    cmds.menuItem(label=u"バウンディングボックス（距離）")
-    cmds.menuItem(label=u"バウンディングボックス（個数）")
 
-    array_count = cmds.intFieldGrp(label=u"間に置く個数", value1=5, columnWidth=[(1, 100), (2, 60)])
-    array_spacing = cmds.floatFieldGrp(
+    array_count = controls["array_count"] = cmds.intFieldGrp(
+        label=u"間に置く個数",
+        value1=5,
+        columnWidth=_CW_FIELD,
+        changeCommand=_mark_dirty,
+    )
+    array_spacing = controls["array_spacing"] = cmds.floatFieldGrp(
         label=u"間隔 (距離)",
         value1=1.0,
-        columnWidth=[(1, 100), (2, 80)],
+        columnWidth=_CW_WIDE_FIELD,
         enable=False,
     )
-    array_bbox_axis = cmds.optionMenuGrp(
+    array_bbox_axis = controls["array_bbox_axis"] = cmds.optionMenuGrp(
         label=u"ローカル軸",
-        columnWidth=[(1, 100)],
+        columnWidth=_CW_LABEL,
         enable=False,
     )
-    cmds.menuItem(label="X")
-    cmds.menuItem(label="Y")
-    cmds.menuItem(label="Z")
-    array_alternate_scale = cmds.checkBox(label=u"スケールを交互に反転", value=False)
-    array_alternate_scale_axis = cmds.optionMenuGrp(
+    _add_menu_items(array_bbox_axis, ("X", "Y", "Z"))
+    on_array_alternate_scale_changed = _make_menu_enable_toggle(
+        controls, "array_alternate_scale_axis"
+    )
+    array_alternate_scale = controls["array_alternate_scale"] = cmds.checkBox(
+        label=u"スケールを交互に反転",
+        value=False,
+        changeCommand=_with_dirty(on_array_alternate_scale_changed),
+    )
+    array_alternate_scale_axis = controls["array_alternate_scale_axis"] = cmds.optionMenuGrp(
         label=u"反転軸",
-        columnWidth=[(1, 100)],
+        columnWidth=_CW_LABEL,
         enable=False,
+        changeCommand=_mark_dirty,
     )
-    cmds.menuItem(label="X")
-    cmds.menuItem(label="Y")
-    cmds.menuItem(label="Z")
-    array_include_end = cmds.checkBox(label=u"終点にも配置する", value=False)
-    array_orient = cmds.optionMenuGrp(label=u"向き", columnWidth=[(1, 100)])
-    cmds.menuItem(label=u"維持 (none)")
-    cmds.menuItem(label=u"終点方向 (aim)")
-    cmds.menuItem(label=u"コピー (copy)")
-    array_parent = cmds.checkBox(label=u"親(始点)の子にする", value=True)
-    array_group = cmds.checkBox(label=u"インスタンスをグループ化", value=False)
-    array_group_name = cmds.textFieldGrp(label=u"グループ名", text="", enable=False)
-
-    def on_array_group_changed(value):
-        cmds.textFieldGrp(array_group_name, e=True, enable=value)
-
-    cmds.checkBox(array_group, e=True, changeCommand=on_array_group_changed)
-
-    def on_array_alternate_scale_changed(value):
-        cmds.optionMenuGrp(array_alternate_scale_axis, e=True, enable=value)
-
-    cmds.checkBox(
-        array_alternate_scale, e=True, changeCommand=on_array_alternate_scale_changed
+    _add_menu_items(array_alternate_scale_axis, ("X", "Y", "Z"))
+    controls["array_include_end"] = cmds.checkBox(label=u"終点にも配置する", value=False, changeCommand=_mark_dirty)
+    array_orient = controls["array_orient"] = cmds.optionMenuGrp(label=u"向き", columnWidth=_CW_LABEL, changeCommand=_mark_dirty)
+    _add_menu_items(array_orient, (u"維持 (none)", u"終点方向 (aim)", u"コピー (copy)"))
+    controls["array_parent"] = cmds.checkBox(label=u"親(始点)の子にする", value=True, changeCommand=_mark_dirty)
+    controls["array_group"] = cmds.checkBox(
+        label=u"インスタンスをグループ化",
+        value=False,
+        changeCommand=_make_enable_toggle(controls, "array_group_name"),
     )
+    controls["array_group_name"] = cmds.textFieldGrp(label=u"グループ名", text="", enable=False)
 
-    def on_array_spec_mode_changed(*_):
-        mode = cmds.optionMenuGrp(array_spec_mode, q=True, select=True)
-        use_spacing = mode == 2
-        use_bbox_distance = mode == 3
-        use_bbox_count = mode == 4
-        cmds.intFieldGrp(array_count, e=True, enable=(mode in (1, 4)))
-        cmds.floatFieldGrp(array_spacing, e=True, enable=use_spacing)
-        cmds.optionMenuGrp(
-            array_bbox_axis,
-            e=True,
-            enable=(use_bbox_distance or use_bbox_count),
-        )
-
-    cmds.optionMenuGrp(array_spec_mode, e=True, changeCommand=on_array_spec_mode_changed)
     on_array_spec_mode_changed()
 
-    def on_array_execute(*_):
-        try:
-            orient_idx = cmds.optionMenuGrp(array_orient, q=True, select=True)
-            orient_value = ["none", "aim", "copy"][orient_idx - 1]
-            group_name = None
-            if cmds.checkBox(array_group, q=True, value=True):
-                text = cmds.textFieldGrp(array_group_name, q=True, text=True).strip()
-                group_name = text if text else ""
-            mode = cmds.optionMenuGrp(array_spec_mode, q=True, select=True)
-            spacing_value = None
-            use_bbox_spacing = False
-            bbox_axis_value = "x"
-            bbox_count_mode_flag = False
-            if mode == 2:
-                spacing_value = cmds.floatFieldGrp(array_spacing, q=True, value1=True)
-            elif mode == 3:
-                use_bbox_spacing = True
-                axis_idx = cmds.optionMenuGrp(array_bbox_axis, q=True, select=True)
-                try:
-                    axis_idx = int(axis_idx)
-                except (TypeError, ValueError):
-                    axis_idx = 1
-                axis_idx = max(1, min(3, axis_idx))
-                bbox_axis_value = ["x", "y", "z"][axis_idx - 1]
-            elif mode == 4:
-                use_bbox_spacing = True
-                bbox_count_mode_flag = True
-                axis_idx = cmds.optionMenuGrp(array_bbox_axis, q=True, select=True)
-                try:
-                    axis_idx = int(axis_idx)
-                except (TypeError, ValueError):
-                    axis_idx = 1
-                axis_idx = max(1, min(3, axis_idx))
-                bbox_axis_value = ["x", "y", "z"][axis_idx - 1]
-            alternate_scale = cmds.checkBox(array_alternate_scale, q=True, value=True)
-            alternate_axis_value = "x"
-            if alternate_scale:
-                alt_axis_idx = cmds.optionMenuGrp(
-                    array_alternate_scale_axis, q=True, select=True
-                )
-                try:
-                    alt_axis_idx = int(alt_axis_idx)
-                except (TypeError, ValueError):
-                    alt_axis_idx = 1
-                alt_axis_idx = max(1, min(3, alt_axis_idx))
-                alternate_axis_value = ["x", "y", "z"][alt_axis_idx - 1]
-            result = instanceArray.instance_child_between_parent(
-                count=cmds.intFieldGrp(array_count, q=True, value1=True),
-                include_end=cmds.checkBox(array_include_end, q=True, value=True),
-                orient=orient_value,
-                parent_instances_to_parent=cmds.checkBox(array_parent, q=True, value=True),
-                group_name=group_name,
-                spacing=spacing_value,
-                use_bbox_spacing=use_bbox_spacing,
-                bbox_axis=bbox_axis_value,
-                alternate_scale=alternate_scale,
-                alternate_scale_axis=alternate_axis_value,
-                bbox_count_mode=bbox_count_mode_flag,
-
-            )
-            if result:
-                cmds.inViewMessage(
-                    amg=u"<span style='color:#b0ffb0'>%d 個のインスタンスを作成しました。</span>" % len(result),
-                    pos="midCenter",
-                    fade=True,
-                )
-        except RuntimeError as exc:
-            _show_error(str(exc))
-            raise
-
-    cmds.button(label=u"配置", command=on_array_execute, bgc=(0.6, 0.8, 0.6))
+    cmds.button(label=u"配置", command=partial(_exec_array, controls), bgc=_BTN_GREEN)
     cmds.setParent("..")
 
     # ------------------------------------------------------------------
     # Chain tab
     # ------------------------------------------------------------------
-    chain_tab = cmds.columnLayout(adj=True, rowSpacing=6, columnAttach=("both", 8))
+    chain_tab = cmds.columnLayout(adj=True, rowSpacing=6, columnAttach=_COL_ATTACH)
     cmds.text(label=u"選択：テンプレート → 対象2つ以上", align="left")
-    chain_spec_mode = cmds.optionMenuGrp(
+    def on_chain_spec_mode_changed(*_):
+        use_spacing = cmds.optionMenuGrp(chain_spec_mode, q=True, select=True) == 2
+        if use_spacing == last_chain_spacing[0]:
+            return
+        last_chain_spacing[0] = use_spacing
+        cmds.intFieldGrp(chain_count, e=True, enable=not use_spacing)
+        cmds.floatFieldGrp(chain_spacing, e=True, enable=use_spacing)
+
+    chain_spec_mode = controls["chain_spec_mode"] = cmds.optionMenuGrp(
         label=u"指定方法",
-        columnWidth=[(1, 110)],
+        columnWidth=_CW_CHAIN_LABEL,
+        changeCommand=on_chain_spec_mode_changed,
     )
-    cmds.menuItem(label=u"個数指定")
-    cmds.menuItem(label=u"距離指定")
+    _add_menu_items(chain_spec_mode, (u"個数指定", u"距離指定"))
 
-    chain_count = cmds.intFieldGrp(label=u"各区間の個数", value1=1, columnWidth=[(1, 110), (2, 60)])
-    chain_spacing = cmds.floatFieldGrp(
+    chain_count = controls["chain_count"] = cmds.intFieldGrp(
+        label=u"各区間の個数",
+        value1=1,
+        columnWidth=_CW_CHAIN_FIELD,
+        changeCommand=_mark_dirty,
+    )
+    chain_spacing = controls["chain_spacing"] = cmds.floatFieldGrp(
         label=u"各区間の間隔",
         value1=1.0,
-        columnWidth=[(1, 110), (2, 80)],
+        columnWidth=_CW_CHAIN_WIDE_FIELD,
         enable=False,
     )
 
-    def on_parent_mode_changed(selection):
-        enable = selection == u"指定ノード"
-        cmds.textFieldGrp(chain_parent_target, e=True, enable=enable)
+    def on_parent_mode_changed(*_):
+        # Query the index rather than mapping the (possibly localized) label.
+        parent_idx = cmds.optionMenuGrp(chain_parent_mode, q=True, select=True)
+        cmds.textFieldGrp(
+            chain_parent_target,
+            e=True,
+            enable=parent_idx == _CHAIN_PARENT_NODE_INDEX,
+        )
 
-    chain_parent_mode = cmds.optionMenuGrp(
+    chain_parent_mode = controls["chain_parent_mode"] = cmds.optionMenuGrp(
         label=u"親付け",
-        columnWidth=[(1, 110)],
-        changeCommand=on_parent_mode_changed,
+        columnWidth=_CW_CHAIN_LABEL,
+        changeCommand=_with_dirty(on_parent_mode_changed),
+    )
+    _add_menu_items(chain_parent_mode, _CHAIN_PARENT_LABELS)
+    chain_parent_target = controls["chain_parent_target"] = cmds.textFieldGrp(
+        label=u"親ノード名",
+        text="",
+        enable=False,
+        changeCommand=_mark_dirty,
     )
-    cmds.menuItem(label=u"なし (ワールド)")
-    cmds.menuItem(label=u"左ノードと同じ")
-    cmds.menuItem(label=u"指定ノード")
-    chain_parent_target = cmds.textFieldGrp(label=u"親ノード名", text="", enable=False)
-
-    chain_orient = cmds.optionMenuGrp(label=u"向き", columnWidth=[(1, 110)])
-    cmds.menuItem(label=u"維持 (none)")
-    cmds.menuItem(label=u"区間方向 (aim)")
-    cmds.menuItem(label=u"コピー (copy)")
-    chain_group = cmds.checkBox(label=u"インスタンスをグループ化", value=False)
-    chain_group_name = cmds.textFieldGrp(label=u"グループ名", text="", enable=False)
-
-    def on_chain_group_changed(value):
-        cmds.textFieldGrp(chain_group_name, e=True, enable=value)
-
-    cmds.checkBox(chain_group, e=True, changeCommand=on_chain_group_changed)
 
-    def on_chain_spec_mode_changed(*_):
-        use_spacing = cmds.optionMenuGrp(chain_spec_mode, q=True, select=True) == 2
-        cmds.intFieldGrp(chain_count, e=True, enable=not use_spacing)
-        cmds.floatFieldGrp(chain_spacing, e=True, enable=use_spacing)
+    chain_orient = controls["chain_orient"] = cmds.optionMenuGrp(label=u"向き", columnWidth=_CW_CHAIN_LABEL, changeCommand=_mark_dirty)
+    _add_menu_items(chain_orient, (u"維持 (none)", u"区間方向 (aim)", u"コピー (copy)"))
+    controls["chain_group"] = cmds.checkBox(
+        label=u"インスタンスをグループ化",
+        value=False,
+        changeCommand=_make_enable_toggle(controls, "chain_group_name"),
+    )
+    controls["chain_group_name"] = cmds.textFieldGrp(label=u"グループ名", text="", enable=False)
 
-    cmds.optionMenuGrp(chain_spec_mode, e=True, changeCommand=on_chain_spec_mode_changed)
     on_chain_spec_mode_changed()
 
-    def on_chain_execute(*_):
-        try:
-            orient_idx = cmds.optionMenuGrp(chain_orient, q=True, select=True)
-            orient_value = ["none", "aim", "copy"][orient_idx - 1]
-            parent_idx = cmds.optionMenuGrp(chain_parent_mode, q=True, select=True)
-            if parent_idx == 1:
-                parent_mode = None
-            elif parent_idx == 2:
-                parent_mode = "same"
-            else:
-                parent_text = cmds.textFieldGrp(chain_parent_target, q=True, text=True).strip()
-                parent_mode = parent_text or None
-            group_name = None
-            if cmds.checkBox(chain_group, q=True, value=True):
-                text = cmds.textFieldGrp(chain_group_name, q=True, text=True).strip()
-                group_name = text if text else ""
-            use_spacing = cmds.optionMenuGrp(chain_spec_mode, q=True, select=True) == 2
-            spacing_value = None
-            if use_spacing:
-                spacing_value = cmds.floatFieldGrp(chain_spacing, q=True, value1=True)
-            result = instanceChain.instance_between_chain(
-                per_segment=cmds.intFieldGrp(chain_count, q=True, value1=True),
-                parent_instances_to=parent_mode,
-                orient=orient_value,
-                group_name=group_name,
-                spacing=spacing_value,
-            )
-            if result:
-                cmds.inViewMessage(
-                    amg=u"<span style='color:#b0ffb0'>%d 個のインスタンスを作成しました。</span>" % len(result),
-                    pos="midCenter",
-                    fade=True,
-                )
-        except RuntimeError as exc:
-            _show_error(str(exc))
-            raise
-
-    cmds.button(label=u"配置", command=on_chain_execute, bgc=(0.6, 0.8, 0.6))
+    cmds.button(label=u"配置", command=partial(_exec_chain, controls), bgc=_BTN_GREEN)
     cmds.setParent("..")
 
     # ------------------------------------------------------------------
     # Radial tab
     # ------------------------------------------------------------------
-    radial_tab = cmds.columnLayout(adj=True, rowSpacing=6, columnAttach=("both", 8))
+    radial_tab = cmds.columnLayout(adj=True, rowSpacing=6, columnAttach=_COL_ATTACH)
     cmds.text(label=u"選択：基準 → インスタンス対象", align="left")
-    radial_count = cmds.intFieldGrp(label=u"個数", value1=8, columnWidth=[(1, 100), (2, 60)])
-    radial_radius = cmds.intFieldGrp(label=u"半径", value1=10, columnWidth=[(1, 100), (2, 60)])
-    radial_axis = cmds.optionMenuGrp(label=u"回転軸", columnWidth=[(1, 100)])
-    cmds.menuItem(label="X")
-    cmds.menuItem(label="Y")
-    cmds.menuItem(label="Z")
-    radial_group = cmds.checkBox(label=u"インスタンスをグループ化", value=False)
-    radial_group_name = cmds.textFieldGrp(label=u"グループ名", text="", enable=False)
-
-    def on_radial_group_changed(value):
-        cmds.textFieldGrp(radial_group_name, e=True, enable=value)
-
-    cmds.checkBox(radial_group, e=True, changeCommand=on_radial_group_changed)
-
-    def on_radial_execute(*_):
-        try:
-            axis_idx = cmds.optionMenuGrp(radial_axis, q=True, select=True)
-            axis_value = ["x", "y", "z"][axis_idx - 1]
-            group_name = None
-            if cmds.checkBox(radial_group, q=True, value=True):
-                text = cmds.textFieldGrp(radial_group_name, q=True, text=True).strip()
-                group_name = text if text else ""
-            result = instanceRadial.create_instance_circle_with_rotation(
-                num_instances=cmds.intFieldGrp(radial_count, q=True, value1=True),
-                axis=axis_value,
-                group_name=group_name,
-                radius=cmds.intFieldGrp(radial_radius, q=True, value1=True),
-            )
-            if result:
-                cmds.inViewMessage(
-                    amg=u"<span style='color:#b0ffb0'>%d 個のインスタンスを作成しました。</span>" % len(result),
-                    pos="midCenter",
-                    fade=True,
-                )
-        except RuntimeError as exc:
-            _show_error(str(exc))
-            raise
-
-    cmds.button(label=u"作成", command=on_radial_execute, bgc=(0.6, 0.8, 0.6))
+    controls["radial_count"] = cmds.intFieldGrp(
+        label=u"個数",
+        value1=8,
+        columnWidth=_CW_FIELD,
+        changeCommand=_mark_dirty,
+    )
+    controls["radial_radius"] = cmds.intFieldGrp(label=u"半径", value1=10, columnWidth=_CW_FIELD)
+    radial_axis = controls["radial_axis"] = cmds.optionMenuGrp(label=u"回転軸", columnWidth=_CW_LABEL, changeCommand=_mark_dirty)
+    _add_menu_items(radial_axis, ("X", "Y", "Z"))
+    controls["radial_group"] = cmds.checkBox(
+        label=u"インスタンスをグループ化",
+        value=False,
+        changeCommand=_make_enable_toggle(controls, "radial_group_name"),
+    )
+    controls["radial_group_name"] = cmds.textFieldGrp(label=u"グループ名", text="", enable=False)
+
+    cmds.button(label=u"作成", command=partial(_exec_radial, controls), bgc=_BTN_GREEN)
     cmds.setParent("..")
 
     # ------------------------------------------------------------------
     # Utility tab
     # ------------------------------------------------------------------
-    util_tab = cmds.columnLayout(adj=True, rowSpacing=8, columnAttach=("both", 8))
+    util_tab = cmds.columnLayout(adj=True, rowSpacing=8, columnAttach=_COL_ATTACH)
     cmds.text(label=u"選択：最初にテンプレート → 置換したいオブジェクト", align="left")
 
-    def on_replace(*_):
-        try:
-            result = instanceUtilities.replace_with_first_instance()
-            if result:
-                cmds.inViewMessage(
-                    amg=u"<span style='color:#b0ffb0'>%d 個のオブジェクトを置換しました。</span>" % len(result),
-                    pos="midCenter",
-                    fade=True,
-                )
-        except RuntimeError as exc:
-            _show_error(str(exc))
-            raise
-
-    cmds.button(label=u"選択をテンプレートのインスタンスで置換", command=on_replace, bgc=(0.6, 0.7, 0.9))
+    cmds.button(label=u"選択をテンプレートのインスタンスで置換", command=_exec_replace, bgc=_BTN_BLUE)
 
     cmds.separator(style="in")
     cmds.text(label=u"選択：ミラーを作成したいインスタンス", align="left")
 
-    def on_mirror_instance(*_):
-        try:
-            result = instanceUtilities.mirror_selected_instances()
-            if result:
-                cmds.inViewMessage(
-                    amg=u"<span style='color:#b0ffb0'>%d 個のインスタンスをミラーしました。</span>" % len(result),
-                    pos="midCenter",
-                    fade=True,
-                )
-        except RuntimeError as exc:
-            _show_error(str(exc))
-            raise
-
-    cmds.button(label=u"インスタンスをミラー", command=on_mirror_instance, bgc=(0.7, 0.7, 0.95))
+    cmds.button(label=u"インスタンスをミラー", command=_exec_mirror, bgc=_BTN_LAVENDER)
 
     cmds.separator(style="in")
     cmds.text(label=u"選択：インスタンス化を解除したいオブジェクト", align="left")
 
-    def on_make_unique(*_):
-        result = instanceUtilities.make_selected_unique()
-        if result:
-            cmds.inViewMessage(
-                amg=u"<span style='color:#b0ffb0'>%d 個のインスタンスを解除しました。</span>" % len(result),
-                pos="midCenter",
-                fade=True,
-            )
-
-    cmds.button(label=u"インスタンス解除", command=on_make_unique, bgc=(0.9, 0.7, 0.6))
+    cmds.button(label=u"インスタンス解除", command=_exec_make_unique, bgc=_BTN_ORANGE)
 
     cmds.separator(style="in")
     cmds.text(label=u"選択：解除→結合→頂点マージ→履歴削除をまとめて行うオブジェクト", align="left")
-    combine_merge_distance = cmds.floatFieldGrp(
+    controls["combine_merge_distance"] = cmds.floatFieldGrp(
         label=u"マージ距離",
         value1=0.001,
-        columnWidth=[(1, 100), (2, 80)],
+        columnWidth=_CW_WIDE_FIELD,
     )
 
-    def on_make_unique_combine(*_):
-        distance_value = cmds.floatFieldGrp(combine_merge_distance, q=True, value1=True)
-        result = instanceUtilities.make_unique_combine_merge(merge_distance=distance_value)
-        if result:
-            combined_node, source_count = result
-            short_name = combined_node.split("|")[-1] if combined_node else combined_node
-            if source_count > 1:
-                message = u"%d 個のインスタンスを解除し、%s に結合しました。" % (source_count, short_name)
-            else:
-                message = u"インスタンスを解除し、%s を更新しました。" % short_name
-            cmds.inViewMessage(
-                amg=f"<span style='color:#b0ffb0'>{message}</span>",
-                pos="midCenter",
-                fade=True,
-            )
-
     cmds.button(
         label=u"解除→結合/マージ/履歴削除",
-        command=on_make_unique_combine,
-        bgc=(0.95, 0.6, 0.6),
+        command=partial(_exec_combine, controls),
+        bgc=_BTN_RED,
     )
     cmds.separator(style="in")
     cmds.text(label=u"選択：アウトライナ順を並べ替えたいオブジェクト", align="left")
-    util_sort_axis = cmds.optionMenuGrp(
+    util_sort_axis = controls["util_sort_axis"] = cmds.optionMenuGrp(
         label=u"基準軸",
-        columnWidth=[(1, 100)],
+        columnWidth=_CW_LABEL,
     )
-    cmds.menuItem(label=u"自動 (最大距離)")
-    cmds.menuItem(label="X")
-    cmds.menuItem(label="Y")
-    cmds.menuItem(label="Z")
-    util_sort_desc = cmds.checkBox(label=u"降順 (大きい順)", value=False)
-
-    def on_sort_selected(*_):
-        axis_idx = cmds.optionMenuGrp(util_sort_axis, q=True, select=True)
-        axis_value = {1: "auto", 2: "x", 3: "y", 4: "z"}[axis_idx]
-        descending = cmds.checkBox(util_sort_desc, q=True, value=True)
-        try:
-            result = instanceUtilities.sort_selected_by_position(axis=axis_value, descending=descending)
-            if result:
-                axis_label = {
-                    "auto": u"自動", "x": "X", "y": "Y", "z": "Z"
-                }[axis_value]
-                order_label = u"降順" if descending else u"昇順"
-                cmds.inViewMessage(
-                    amg=u"<span style='color:#b0ffb0'>%d 個のオブジェクトを %s (%s) で並べ替えました。</span>"
-                    % (len(result), axis_label, order_label),
-                    pos="midCenter",
-                    fade=True,
-                )
-        except RuntimeError as exc:
-            _show_error(str(exc))
-            raise
-
-    cmds.button(label=u"ポジションで並べ替え", command=on_sort_selected, bgc=(0.7, 0.9, 0.7))
+    _add_menu_items(util_sort_axis, (u"自動 (最大距離)", "X", "Y", "Z"))
+    controls["util_sort_desc"] = cmds.checkBox(label=u"降順 (大きい順)", value=False)
+
+    cmds.button(label=u"ポジションで並べ替え", command=partial(_exec_sort, controls), bgc=_BTN_LIGHT_GREEN)
     cmds.setParent("..")
 
     cmds.tabLayout(
@@ -678,48 +831,26 @@ def show_ui():
 
     def on_save_settings(*_):
         save_prefs()
-        cmds.inViewMessage(
-            amg=u"<span style='color:#b0ffb0'>設定を保存しました。</span>",
-            pos="midCenter",
-            fade=True,
-        )
+        _show_success(_MSG_SAVED)
 
-    cmds.button(label=u"設定保存", command=on_save_settings, bgc=(0.8, 0.8, 0.8))
-
-    _UI_CONTROLS = {
-        "array_spec_mode": array_spec_mode,
-        "array_count": array_count,
-        "array_include_end": array_include_end,
-        "array_orient": array_orient,
-        "array_parent": array_parent,
-        "array_alternate_scale": array_alternate_scale,
-        "array_alternate_scale_axis": array_alternate_scale_axis,
-        "chain_count": chain_count,
-        "chain_parent_mode": chain_parent_mode,
-        "chain_parent_target": chain_parent_target,
-        "chain_orient": chain_orient,
-        "radial_count": radial_count,
-        "radial_axis": radial_axis,
-    }
-
-    load_prefs()
+    cmds.button(label=u"設定保存", command=on_save_settings, bgc=_BTN_GRAY)
 
-    on_array_spec_mode_changed()
-    on_array_group_changed(cmds.checkBox(array_group, q=True, value=True))
-    on_array_alternate_scale_changed(
-        cmds.checkBox(array_alternate_scale, q=True, value=True)
-    )
+
+    restored = load_prefs()
+
+    # The spec mode and group toggles are not persisted, so only the
+    # alternate-scale axis can be out of sync after restoring prefs.
+    if "array_alternate_scale" in restored:
+        on_array_alternate_scale_changed(
+            cmds.checkBox(array_alternate_scale, q=True, value=True)
+        )
 
     def on_close(*_):
-        global _UI_CONTROLS
-        try:
-            save_prefs()
-        finally:
-            _UI_CONTROLS = {}
+        # The window is only hidden (retain=True), so keep the controls around.
+        save_prefs()
 
     cmds.window(win, e=True, closeCommand=on_close)
 
-    cmds.showWindow(win)
     return win
 
 
@@ -2,6 +2,8 @@
 import math
 import maya.cmds as cmds
 
+from instanceUtilities import batch_edit, create_instances
+
 _AXIS_INDICES = {"x": 0, "y": 1, "z": 2}
 
 
@@ -69,6 +71,47 @@ def _compute_bbox_spacing(node, axis):
     return info["spacing"]
 
 
+def _set_scale(node, values):
+    """Set ``node``'s local scale, skipping axes that cannot be set."""
+    try:
+        cmds.setAttr(f"{node}.scale", *values, type="double3")
+        return
+    except RuntimeError:
+        pass
+    # 一部の軸がロックされている場合は軸ごとに設定する
+    for attr_name, value in zip(("scaleX", "scaleY", "scaleZ"), values):
+        try:
+            cmds.setAttr(f"{node}.{attr_name}", value)
+        except RuntimeError:
+            pass
+
+
+def _set_translation(node, pos, local_is_world):
+    """Move ``node`` to the world position ``pos``.
+
+    When the parent space equals world space the translate plug is written
+    directly, skipping xform's space conversion.
+    """
+    if local_is_world:
+        cmds.setAttr(f"{node}.translate", *pos, type="double3")
+    else:
+        cmds.xform(node, ws=True, t=pos)
+
+
+def _aim_rotation(node, target):
+    """Aim ``node``'s +Z at ``target`` (+Y up) and return its world rotation."""
+    ac = cmds.aimConstraint(
+        target,
+        node,
+        aimVector=(0, 0, 1),
+        upVector=(0, 1, 0),
+        worldUpType="scene",
+    )[0]
+    cmds.delete(ac)
+    return cmds.xform(node, q=True, ws=True, ro=True)
+
+
+@batch_edit
 def instance_child_between_parent(
     parent=None,
     child=None,
@@ -147,16 +190,10 @@ def instance_child_between_parent(
     if parents:
         child_parent = parents[0]
 
+    # parent は上で存在確認済み、child_parent は listRelatives の結果なので再確認しない
     parent_target = None
     if parent_instances_to_parent:
-        if count_mode:
-            if parent and cmds.objExists(parent):
-                parent_target = parent
-            elif child_parent and cmds.objExists(child_parent):
-                parent_target = child_parent
-        else:
-            if parent and cmds.objExists(parent):
-                parent_target = parent
+        parent_target = parent or (child_parent if count_mode else None)
 
     group_node = None
     if group_name is not None:
@@ -165,8 +202,12 @@ def instance_child_between_parent(
         if parent_target:
             group_node = cmds.parent(group_node, parent_target)[0]
 
-    alternate_axis = None
-    base_scale_values = None
+    # ワールド直下か、ワールド直下の新規グループに入る場合はローカル座標がワールド座標と一致する
+    local_is_world = (group_node is not None and not parent_target) or (
+        group_node is None and parent_target is None and child_parent is None
+    )
+
+    scale_cycle = None
     if alternate_scale:
         alternate_axis = (alternate_scale_axis or "x").lower()
         if alternate_axis not in _AXIS_INDICES:
@@ -179,6 +220,20 @@ def instance_child_between_parent(
             base_scale_values = [1.0, 1.0, 1.0]
         else:
             base_scale_values = list(base_scale_values[:3])
+        flipped_scale_values = list(base_scale_values)
+        flipped_scale_values[_AXIS_INDICES[alternate_axis]] *= -1
+        # 偶数番目は元のスケール、奇数番目は反転したスケール。
+        # 親が変わらなければインスタンスは元のスケールのままなので偶数番目は設定しない
+        keeps_parent = (group_node or parent_target) in (None, child_parent)
+        base_scale = None if keeps_parent else tuple(base_scale_values)
+        scale_cycle = (base_scale, tuple(flipped_scale_values))
+
+    copy_rot = None
+    if orient == "copy":
+        copy_rot = cmds.xform(child, q=True, ws=True, ro=True)
+        # 回転がゼロならインスタンスも既にゼロなので設定を省く
+        if all(abs(r) < 1e-9 for r in copy_rot):
+            copy_rot = None
 
     if count_mode:
         info = _compute_bbox_axis_info(child, bbox_axis)
@@ -204,56 +259,32 @@ def instance_child_between_parent(
             cmds.warning(u"count は 1 以上にしてください。何も作成しません。")
             return []
 
-        created = []
+        created = create_instances(child, len(multipliers), group_node or parent_target)
         aim_helper = None
+        aim_rot = None
         try:
-            for index, step in enumerate(multipliers):
-                pos = [
-                    c_pos[i] + direction[i] * spacing_value * step
-                    for i in range(3)
-                ]
-                inst = cmds.instance(child, smartTransform=False)[0]
-
-                if group_node:
-                    inst = cmds.parent(inst, group_node)[0]
-                elif parent_instances_to_parent and parent_target:
-                    inst = cmds.parent(inst, parent_target)[0]
-
-                cmds.xform(inst, ws=True, t=pos)
-
-                if orient == "copy":
-                    rot = cmds.xform(child, q=True, ws=True, ro=True)
-                    cmds.xform(inst, ws=True, ro=rot)
-                elif orient == "aim":
-                    if aim_helper is None:
+            # 1ステップ分の移動量を先に求めておく
+            dx, dy, dz = (d * spacing_value for d in direction)
+            cx, cy, cz = c_pos[:3]
+            for index, (inst, step) in enumerate(zip(created, multipliers)):
+                pos = [cx + dx * step, cy + dy * step, cz + dz * step]
+                rot = copy_rot if copy_rot is not None else aim_rot
+                if rot is not None:
+                    # 位置と回転は1回の xform でまとめて設定する
+                    cmds.xform(inst, ws=True, t=pos, ro=rot)
+                else:
+                    _set_translation(inst, pos, local_is_world)
+                    if orient == "aim":
+                        # 方向は全インスタンス共通なので、拘束は最初の1つだけで済ませる
                         aim_helper = cmds.spaceLocator()[0]
-                    target_pos = [pos[i] + direction[i] for i in range(3)]
-                    cmds.xform(aim_helper, ws=True, t=target_pos)
-                    ac = cmds.aimConstraint(
-                        aim_helper,
-                        inst,
-                        aimVector=(0, 0, 1),
-                        upVector=(0, 1, 0),
-                        worldUpType="scene",
-                    )[0]
-                    cmds.delete(ac)
-
-                if alternate_axis and base_scale_values:
-                    axis_index = _AXIS_INDICES[alternate_axis]
-                    flip = -1 if (index % 2 == 1) else 1
-                    scale_values = list(base_scale_values)
-                    scale_values[axis_index] = base_scale_values[axis_index] * flip
-                    axis_attrs = ["scaleX", "scaleY", "scaleZ"]
-                    for attr_index, attr_name in enumerate(axis_attrs):
-                        value = scale_values[attr_index]
-                        try:
-                            cmds.setAttr(f"{inst}.{attr_name}", value)
-                        except RuntimeError:
-                            pass
-
-                created.append(inst)
+                        target_pos = [pos[i] + direction[i] for i in range(3)]
+                        cmds.xform(aim_helper, ws=True, t=target_pos)
+                        aim_rot = _aim_rotation(inst, aim_helper)
+
+                if scale_cycle and scale_cycle[index % 2]:
+                    _set_scale(inst, scale_cycle[index % 2])
         finally:
-            if aim_helper and cmds.objExists(aim_helper):
+            if aim_helper:
                 cmds.delete(aim_helper)
 
         return created
@@ -292,10 +323,9 @@ def instance_child_between_parent(
                 cmds.warning(u"親と子の位置が同じため、距離指定では配置できません。")
                 return []
         else:
-            current = spacing_value
-            while current < total_dist - eps:
-                steps.append(current / total_dist)
-                current += spacing_value
+            # spacing_value * i < total_dist - eps を満たす i の個数
+            step_count = max(0, int(math.ceil((total_dist - eps) / spacing_value)) - 1)
+            steps = [spacing_value * i / total_dist for i in range(1, step_count + 1)]
             if include_end:
                 steps.append(1.0)
     else:
@@ -311,45 +341,23 @@ def instance_child_between_parent(
         cmds.warning(u"指定条件では配置するインスタンスがありません。")
         return []
 
-    created = []
-    for index, t in enumerate(steps):
-        pos = [p_pos[i] + (c_pos[i] - p_pos[i]) * t for i in range(3)]
-        inst = cmds.instance(child, smartTransform=False)[0]
-
-        if group_node:
-            inst = cmds.parent(inst, group_node)[0]
-        elif parent_instances_to_parent and parent_target:
-            inst = cmds.parent(inst, parent_target)[0]
-
-        cmds.xform(inst, ws=True, t=pos)
-
-        if orient == "copy":
-            rot = cmds.xform(child, q=True, ws=True, ro=True)
-            cmds.xform(inst, ws=True, ro=rot)
-        elif orient == "aim":
-            ac = cmds.aimConstraint(
-                child,
-                inst,
-                aimVector=(0, 0, 1),
-                upVector=(0, 1, 0),
-                worldUpType="scene",
-            )[0]
-            cmds.delete(ac)
-
-        if alternate_axis and base_scale_values:
-            axis_index = _AXIS_INDICES[alternate_axis]
-            flip = -1 if (index % 2 == 1) else 1
-            scale_values = list(base_scale_values)
-            scale_values[axis_index] = base_scale_values[axis_index] * flip
-            axis_attrs = ["scaleX", "scaleY", "scaleZ"]
-            for attr_index, attr_name in enumerate(axis_attrs):
-                value = scale_values[attr_index]
-                try:
-                    cmds.setAttr(f"{inst}.{attr_name}", value)
-                except RuntimeError:
-                    pass
-
-        created.append(inst)
+    created = create_instances(child, len(steps), group_node or parent_target)
+    aim_rot = None
+    px, py, pz = p_pos[:3]
+    dx, dy, dz = c_pos[0] - px, c_pos[1] - py, c_pos[2] - pz
+    for index, (inst, t) in enumerate(zip(created, steps)):
+        pos = [px + dx * t, py + dy * t, pz + dz * t]
+        rot = copy_rot if copy_rot is not None else aim_rot
+        if rot is not None:
+            cmds.xform(inst, ws=True, t=pos, ro=rot)
+        else:
+            _set_translation(inst, pos, local_is_world)
+            if orient == "aim":
+                # 全インスタンスが親→子の直線上にあるため向きは共通
+                aim_rot = _aim_rotation(inst, child)
+
+        if scale_cycle and scale_cycle[index % 2]:
+            _set_scale(inst, scale_cycle[index % 2])
 
     return created
 
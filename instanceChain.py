@@ -2,22 +2,24 @@
 import maya.cmds as cmds
 import math
 
+from instanceUtilities import batch_edit, create_instances
+
 
 def _cross(a, b):
-    return [
+    return (
         a[1] * b[2] - a[2] * b[1],
         a[2] * b[0] - a[0] * b[2],
         a[0] * b[1] - a[1] * b[0],
-    ]
+    )
 
-def _vec_sub(a,b): return [a[i]-b[i] for i in range(3)]
-def _vec_add(a,b): return [a[i]+b[i] for i in range(3)]
-def _vec_mul(a,s): return [a[i]*s for i in range(3)]
-def _dot(a,b): return sum(a[i]*b[i] for i in range(3))
-def _len(a): return math.sqrt(_dot(a,a))
+def _vec_sub(a,b): return (a[0]-b[0], a[1]-b[1], a[2]-b[2])
+def _vec_add(a,b): return (a[0]+b[0], a[1]+b[1], a[2]+b[2])
+def _vec_mul(a,s): return (a[0]*s, a[1]*s, a[2]*s)
+def _dot(a,b): return a[0]*b[0] + a[1]*b[1] + a[2]*b[2]
+def _len(a): return math.sqrt(a[0]*a[0] + a[1]*a[1] + a[2]*a[2])
 def _norm(a):
     L = _len(a)
-    return [a[i]/L for i in range(3)] if L>1e-12 else [0,0,0]
+    return (a[0]/L, a[1]/L, a[2]/L) if L>1e-12 else (0.0, 0.0, 0.0)
 
 def _world_pos(node):
     return cmds.xform(node, q=True, ws=True, t=True)
@@ -32,35 +34,41 @@ def _world_bbox_data(node):
         return None
 
     min_x, min_y, min_z, max_x, max_y, max_z = bbox
-    corners = []
-    for ix in (min_x, max_x):
-        for iy in (min_y, max_y):
-            for iz in (min_z, max_z):
-                corners.append([ix, iy, iz])
-
-    center = [
+    center = (
         (min_x + max_x) * 0.5,
         (min_y + max_y) * 0.5,
         (min_z + max_z) * 0.5,
-    ]
+    )
+    half = (
+        (max_x - min_x) * 0.5,
+        (max_y - min_y) * 0.5,
+        (max_z - min_z) * 0.5,
+    )
 
-    return {"corners": corners, "center": center}
+    return {"center": center, "half": half}
 
 
-def _project_range(points, axis, origin):
-    values = [_dot(_vec_sub(p, origin), axis) for p in points]
-    return (min(values), max(values)) if values else (0.0, 0.0)
+def _project_range(bbox, axis, origin):
+    # AABB の8頂点を axis に投影した範囲は、中心の投影値 ± 半径で求まる
+    center = _dot(_vec_sub(bbox["center"], origin), axis)
+    half = bbox["half"]
+    radius = half[0] * abs(axis[0]) + half[1] * abs(axis[1]) + half[2] * abs(axis[2])
+    return (center - radius, center + radius)
 
 def _max_dist_pair(points):
     # 全点間の最遠ペアを見つけて並び方向を安定化
+    # 比較だけなので距離の2乗で判定し、sqrt と一時リストを省く
     n = len(points)
     maxd = -1.0
     pair = (0, 0)
     for i in range(n):
-        pi = points[i]
+        xi, yi, zi = points[i]
         for j in range(i+1, n):
-            pj = points[j]
-            d = _len(_vec_sub(pi, pj))
+            xj, yj, zj = points[j]
+            dx = xi - xj
+            dy = yi - yj
+            dz = zi - zj
+            d = dx * dx + dy * dy + dz * dz
             if d > maxd:
                 maxd = d
                 pair = (i, j)
@@ -72,6 +80,7 @@ except NameError:  # pragma: no cover - Python 3 only
     string_types = (str,)
 
 
+@batch_edit
 def instance_between_chain(
     template=None,
     targets=None,
@@ -136,8 +145,9 @@ def instance_between_chain(
     iA, iB = _max_dist_pair(pts)
     A = pts[iA]; B = pts[iB]
     dirAB = _norm(_vec_sub(B, A))
-    # Aを原点として投影値で昇順
-    order = sorted(range(len(targets)), key=lambda i: _dot(_vec_sub(pts[i], A), dirAB))
+    # Aを原点として投影値で昇順（投影値は先に一度だけ計算する）
+    proj = [_dot(_vec_sub(p, A), dirAB) for p in pts]
+    order = sorted(range(len(targets)), key=proj.__getitem__)
     ordered_nodes = [targets[i] for i in order]
     ordered_pts   = [pts[i] for i in order]
 
@@ -173,7 +183,6 @@ def instance_between_chain(
     created = []
     fill_divisions_value = 1
     alternate_axis_index = None
-    axis_attrs = ["scaleX", "scaleY", "scaleZ"]
     if fill_boxes:
         try:
             fill_divisions_value = int(fill_divisions)
@@ -190,12 +199,36 @@ def instance_between_chain(
     created_template = False
     global_index = 0
 
+    # ループ中に変わらない親付け先と回転は先に求めておく
+    explicit_parent = None
+    if (
+        isinstance(parent_instances_to, string_types)
+        and parent_instances_to != "same"
+        and cmds.objExists(parent_instances_to)
+    ):
+        explicit_parent = parent_instances_to
+    # 各ノードは左右両方の区間で使われるので、バウンディングボックスは1回ずつ取得する
+    bbox_data = [_world_bbox_data(n) for n in ordered_nodes] if fill_boxes else None
+    copy_rot = None
+    if orient == "copy" and not fill_boxes:
+        copy_rot = cmds.xform(template, q=True, ws=True, ro=True)
+
     for k in range(len(ordered_nodes)-1):
         left_node  = ordered_nodes[k]
         right_node = ordered_nodes[k+1]
+
+        # 親付け先（区間内で共通）
+        seg_parent = group_node or explicit_parent
+        if not seg_parent and parent_instances_to == "same":
+            # 左ノードと同じ親
+            parent = cmds.listRelatives(left_node, p=True, f=True)
+            if parent:
+                seg_parent = parent[0]
+        # None の場合は親付けしない
+
         if fill_boxes:
-            left_bbox = _world_bbox_data(left_node)
-            right_bbox = _world_bbox_data(right_node)
+            left_bbox = bbox_data[k]
+            right_bbox = bbox_data[k+1]
             if not left_bbox or not right_bbox:
                 continue
 
@@ -206,8 +239,8 @@ def instance_between_chain(
                 continue
             dir_z = [dir_vec[i] / dir_len for i in range(3)]
 
-            left_proj = _project_range(left_bbox["corners"], dir_z, anchor)
-            right_proj = _project_range(right_bbox["corners"], dir_z, anchor)
+            left_proj = _project_range(left_bbox, dir_z, anchor)
+            right_proj = _project_range(right_bbox, dir_z, anchor)
             left_proj_max = left_proj[1]
             right_proj_min = right_proj[0]
             gap_total = right_proj_min - left_proj_max
@@ -219,16 +252,16 @@ def instance_between_chain(
                 up_ref = (1.0, 0.0, 0.0)
             dir_x = _cross(up_ref, dir_z)
             if _len(dir_x) < 1e-6:
-                dir_x = [1.0, 0.0, 0.0]
+                dir_x = (1.0, 0.0, 0.0)
             dir_x = _norm(dir_x)
             dir_y = _cross(dir_z, dir_x)
             dir_y = _norm(dir_y)
             dir_x = _norm(_cross(dir_y, dir_z))
 
-            left_x_range = _project_range(left_bbox["corners"], dir_x, anchor)
-            right_x_range = _project_range(right_bbox["corners"], dir_x, anchor)
-            left_y_range = _project_range(left_bbox["corners"], dir_y, anchor)
-            right_y_range = _project_range(right_bbox["corners"], dir_y, anchor)
+            left_x_range = _project_range(left_bbox, dir_x, anchor)
+            right_x_range = _project_range(right_bbox, dir_x, anchor)
+            left_y_range = _project_range(left_bbox, dir_y, anchor)
+            right_y_range = _project_range(right_bbox, dir_y, anchor)
 
             left_x_size = left_x_range[1] - left_x_range[0]
             right_x_size = right_x_range[1] - right_x_range[0]
@@ -248,6 +281,11 @@ def instance_between_chain(
             )
 
             segment_length = gap_total / float(fill_divisions_value)
+            # 区間内で変わらない中心の X/Y オフセットは先に足しておく
+            base_center = _vec_add(
+                _vec_add(anchor, _vec_mul(dir_x, center_offset_x)),
+                _vec_mul(dir_y, center_offset_y),
+            )
             for div in range(fill_divisions_value):
                 start = left_proj_max + segment_length * div
                 mid_scalar = start + segment_length * 0.5
@@ -263,41 +301,31 @@ def instance_between_chain(
                 else:
                     inst = cmds.instance(box_template, smartTransform=False)[0]
 
-                if group_node:
-                    inst = cmds.parent(inst, group_node)[0]
+                if seg_parent:
+                    inst = cmds.parent(inst, seg_parent)[0]
                     if created_template:
                         box_template = inst
-                elif parent_instances_to == "same":
-                    parent = cmds.listRelatives(left_node, p=True, f=True)
-                    if parent:
-                        inst = cmds.parent(inst, parent[0])[0]
-                        if created_template:
-                            box_template = inst
-                elif isinstance(parent_instances_to, string_types):
-                    if cmds.objExists(parent_instances_to):
-                        inst = cmds.parent(inst, parent_instances_to)[0]
-                        if created_template:
-                            box_template = inst
 
+                center_pos = _vec_add(base_center, _vec_mul(dir_z, mid_scalar))
+
+                # 回転と位置は1回の xform で設定し、スケールはローカルで別に設定する
                 matrix = [
                     dir_x[0], dir_y[0], dir_z[0], 0.0,
                     dir_x[1], dir_y[1], dir_z[1], 0.0,
                     dir_x[2], dir_y[2], dir_z[2], 0.0,
-                    0.0,       0.0,       0.0,       1.0,
+                    center_pos[0], center_pos[1], center_pos[2], 1.0,
                 ]
                 cmds.xform(inst, ws=True, matrix=matrix)
 
-                center_pos = anchor
-                center_pos = _vec_add(center_pos, _vec_mul(dir_x, center_offset_x))
-                center_pos = _vec_add(center_pos, _vec_mul(dir_y, center_offset_y))
-                center_pos = _vec_add(center_pos, _vec_mul(dir_z, mid_scalar))
-                cmds.xform(inst, ws=True, t=center_pos)
-
-                for axis_i, attr in enumerate(axis_attrs):
-                    try:
-                        cmds.setAttr(f"{inst}.{attr}", scale_values[axis_i])
-                    except RuntimeError:
-                        pass
+                try:
+                    cmds.setAttr(f"{inst}.scale", *scale_values, type="double3")
+                except RuntimeError:
+                    # 一部の軸がロックされている場合は軸ごとに設定する
+                    for attr, value in zip(("scaleX", "scaleY", "scaleZ"), scale_values):
+                        try:
+                            cmds.setAttr(f"{inst}.{attr}", value)
+                        except RuntimeError:
+                            pass
 
                 created.append(inst)
                 created_template = False
@@ -314,49 +342,42 @@ def instance_between_chain(
             eps = 1e-6
             t_values = []
             if seg_len > eps:
-                current = spacing_value
-                while current < seg_len - eps:
-                    t_values.append(current / seg_len)
-                    current += spacing_value
+                # spacing_value * i < seg_len - eps を満たす i の個数
+                step_count = max(0, int(math.ceil((seg_len - eps) / spacing_value)) - 1)
+                step_t = spacing_value / seg_len
+                t_values = [step_t * i for i in range(1, step_count + 1)]
             else:
                 t_values = []
         else:
             t_values = [float(s)/(per_segment+1) for s in range(1, per_segment+1)]
 
-        for t in t_values:
-            pos = _vec_add(p0, _vec_mul(seg, t))
+        # 区間内のインスタンスはまとめて親付けする
+        seg_insts = create_instances(template, len(t_values), seg_parent)
 
-            inst = cmds.instance(template, smartTransform=False)[0]
-
-            # 親付け
-            if group_node:
-                inst = cmds.parent(inst, group_node)[0]
-            elif parent_instances_to == "same":
-                # 左ノードと同じ親
-                parent = cmds.listRelatives(left_node, p=True, f=True)
-                if parent:
-                    inst = cmds.parent(inst, parent[0])[0]
-            elif isinstance(parent_instances_to, string_types):
-                if cmds.objExists(parent_instances_to):
-                    inst = cmds.parent(inst, parent_instances_to)[0]
-            # None の場合は親付けしない
+        # 区間内のインスタンスは同一直線上にあるので aim の回転は区間ごとに1回だけ求める
+        seg_aim_rot = None
+        for inst, t in zip(seg_insts, t_values):
+            pos = _vec_add(p0, _vec_mul(seg, t))
 
             # 位置
             cmds.xform(inst, ws=True, t=pos)
 
             # 回転
             if orient == "copy":
-                rot = cmds.xform(template, q=True, ws=True, ro=True)
-                cmds.xform(inst, ws=True, ro=rot)
+                cmds.xform(inst, ws=True, ro=copy_rot)
             elif orient == "aim":
-                # 区間方向へ +Z を向ける（必要なら aimVector/upVector 調整）
-                ac = cmds.aimConstraint(
-                    right_node, inst,
-                    aimVector=(0,0,1),
-                    upVector=(0,1,0),
-                    worldUpType="scene"
-                )[0]
-                cmds.delete(ac)
+                if seg_aim_rot is None:
+                    # 区間方向へ +Z を向ける（必要なら aimVector/upVector 調整）
+                    ac = cmds.aimConstraint(
+                        right_node, inst,
+                        aimVector=(0,0,1),
+                        upVector=(0,1,0),
+                        worldUpType="scene"
+                    )[0]
+                    cmds.delete(ac)
+                    seg_aim_rot = cmds.xform(inst, q=True, ws=True, ro=True)
+                else:
+                    cmds.xform(inst, ws=True, ro=seg_aim_rot)
             # "none" は何もしない
 
             created.append(inst)
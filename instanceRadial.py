@@ -1,9 +1,14 @@
 # -*- coding: utf-8 -*-
 """Radial instance placement utilities."""
 
+import math
+
 import maya.cmds as cmds
 
+from instanceUtilities import batch_edit
+
 
+@batch_edit
 def create_instance_circle_with_rotation(num_instances=8, axis="y", group_name=None, radius=0.0):
     """Create instances of the second selected object around the first.
 
@@ -33,33 +38,37 @@ def create_instance_circle_with_rotation(num_instances=8, axis="y", group_name=N
     angle_step = 360.0 / float(num_instances)
     created = []
 
+    # 基準の位置・回転（スケールなし）と半径オフセットを1つの行列にまとめ、全 null で使い回す
+    base_matrix = cmds.xform(base, q=True, ws=True, matrix=True)
+    rows = []
+    for row in range(3):
+        vec = base_matrix[row * 4:row * 4 + 3]
+        length = math.sqrt(sum(v * v for v in vec)) or 1.0
+        rows.append([v / length for v in vec])
+    offset_row = rows["xyz".index(axis)]
+    translate = [base_matrix[12 + i] + offset_row[i] * radius for i in range(3)]
+    null_matrix = rows[0] + [0.0] + rows[1] + [0.0] + rows[2] + [0.0] + translate + [1.0]
+
     group_node = None
     if group_name is not None:
         name = (group_name or "").strip() or "instanceGroup#"
         group_node = cmds.group(empty=True, name=name)
 
-    for i in range(num_instances):
-        null = cmds.group(empty=True, name=f"circle_null_{i:02}")
+    # null はグループ直下に直接作成し、後からの親付けを省く
+    null_kwargs = {"parent": group_node} if group_node else {}
+    rotate_attr = f"rotate{axis.upper()}"
 
-        # Transformの一致をMatchTransform系で行う
-        cmds.matchTransform(null, base, pos=True, rot=True)
+    for i in range(num_instances):
+        null = cmds.group(empty=True, name=f"circle_null_{i:02}", **null_kwargs)
 
-        if group_node:
-            null = cmds.parent(null, group_node)[0]
-        if radius:
-            offset_vector = {
-                "x": (radius, 0.0, 0.0),
-                "y": (0.0, radius, 0.0),
-                "z": (0.0, 0.0, radius),
-            }[axis]
-            cmds.move(*offset_vector, null, relative=True, objectSpace=True)
+        cmds.xform(null, ws=True, matrix=null_matrix)
 
         # インスタンス作成・親子付け
         instance = cmds.instance(target, name=f"{target}_inst_{i:02}")[0]
         instance = cmds.parent(instance, null)[0]
 
         # 回転追加
-        cmds.setAttr(f"{null}.rotate{axis.upper()}", angle_step * i)
+        cmds.setAttr(f"{null}.{rotate_attr}", angle_step * i)
 
         created.append(instance)
 
@@ -1,9 +1,95 @@
 # -*- coding: utf-8 -*-
 """Utility functions for working with instances."""
 
+from functools import wraps
+
 import maya.cmds as cmds
 
 
+# Nesting depth of batch_edit calls; only the outermost one opens the chunk.
+_batch_depth = 0
+
+_AXIS_INDEX = {"x": 0, "y": 1, "z": 2}
+_SCALE_ATTRS = (".scaleX", ".scaleY", ".scaleZ")
+
+
+def batch_edit(func):
+    """Run ``func`` as a single undo step with viewport refresh suspended.
+
+    Nested calls (e.g. make_unique_combine_merge -> make_selected_unique) run
+    inside the outer chunk instead of resuming refresh halfway through.
+    """
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        global _batch_depth
+        if _batch_depth:
+            _batch_depth += 1
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _batch_depth -= 1
+
+        _batch_depth = 1
+        cmds.undoInfo(openChunk=True)
+        cmds.refresh(suspend=True)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _batch_depth = 0
+            cmds.refresh(suspend=False)
+            cmds.undoInfo(closeChunk=True)
+            cmds.refresh()
+
+    return wrapper
+
+
+def create_instances(node, count, parent_node=None):
+    """Create ``count`` instances of ``node`` and parent them in one call.
+
+    Args:
+        node (str): Transform to instance.
+        count (int): Number of instances to create.
+        parent_node (str|None): New parent for every instance. ``None`` keeps
+            them next to ``node``.
+
+    Returns:
+        list[str]: Instance names, in creation order.
+    """
+    instances = [cmds.instance(node, smartTransform=False)[0] for _ in range(count)]
+    if parent_node and instances:
+        instances = cmds.parent(instances, parent_node)
+    return instances
+
+
+def _parent_path(node):
+    """Return the parent of the long DAG path *node*, or None at the root."""
+    return node.rpartition("|")[0] or None
+
+
+def _short_name(node):
+    """Return the leaf name of the DAG path *node*."""
+    return node.rpartition("|")[2]
+
+
+def _drop_descendants(nodes):
+    """Return *nodes* without entries whose ancestor is also in *nodes*.
+
+    Deleting an ancestor removes its descendants as well, so only the topmost
+    nodes need handling when originals are deleted in one batch.
+    """
+    node_set = set(nodes)
+    result = []
+    for node in nodes:
+        parent = _parent_path(node)
+        while parent and parent not in node_set:
+            parent = _parent_path(parent)
+        if not parent:
+            result.append(node)
+    return result
+
+
+@batch_edit
 def replace_with_first_instance(template=None, targets=None):
     """Replace targets with instances of the template transform.
 
@@ -26,29 +112,39 @@ def replace_with_first_instance(template=None, targets=None):
         cmds.error(u"テンプレートが存在しません。")
         return []
 
-    created = []
-    for target in targets:
-        if target == template or not cmds.objExists(target):
+    # 存在確認と親の取得は長い名前からまとめて行う
+    template = cmds.ls(template, long=True)[0]
+    targets = cmds.ls(targets, long=True) or []
+    # インスタンスはテンプレートと同じ親の下に作られる
+    instance_parent = _parent_path(template)
+
+    targets = [target for target in targets if target != template]
+
+    # インスタンスはまとめて作成し、移動先の親ごとに一度の parent 呼び出しで移す
+    instances = create_instances(template, len(targets))
+    parent_batches = {}
+    for index, target in enumerate(targets):
+        desired_parent = _parent_path(target)
+        if desired_parent and desired_parent != instance_parent:
+            parent_batches.setdefault(desired_parent, []).append(index)
+
+    for desired_parent, indices in parent_batches.items():
+        batch = [instances[index] for index in indices]
+        try:
+            # 位置は直後の matchTransform で合わせるため、ワールド位置の補正は不要
+            result = cmds.parent(batch, desired_parent, relative=True)
+        except RuntimeError as exc:
+            cmds.warning(
+                u"%s の親を %s に設定できませんでした: %s"
+                % (", ".join(batch), desired_parent, exc)
+            )
             continue
+        for index, inst in zip(indices, result or []):
+            instances[index] = inst
 
-        parent = cmds.listRelatives(target, parent=True, fullPath=True)
-        short_name = target.split("|")[-1]
-
-        inst = cmds.instance(template, smartTransform=False)[0]
-        if parent:
-            desired_parent = parent[0]
-            current_parent = cmds.listRelatives(inst, parent=True, fullPath=True) or []
-            if not current_parent or current_parent[0] != desired_parent:
-                try:
-                    result = cmds.parent(inst, desired_parent)
-                except RuntimeError as exc:
-                    cmds.warning(
-                        u"%s の親を %s に設定できませんでした: %s"
-                        % (inst, desired_parent, exc)
-                    )
-                else:
-                    if result:
-                        inst = result[0]
+    renames = []
+    for target, inst in zip(targets, instances):
+        short_name = _short_name(target)
 
         try:
             cmds.matchTransform(inst, target, pos=True, rot=True, scl=True)
@@ -60,9 +156,22 @@ def replace_with_first_instance(template=None, targets=None):
             cmds.delete(inst)
             continue
 
-        cmds.delete(target)
-        inst = cmds.rename(inst, short_name)
-        created.append(inst)
+        renames.append((target, inst, short_name))
+
+    # 置換に成功した祖先と一緒に消える子孫（とその配下に置いたインスタンス）は除外する。
+    # 祖先の置換に失敗した場合、子孫は通常どおり置換される
+    kept = set(_drop_descendants([target for target, _, _ in renames]))
+    dropped = [inst for target, inst, _ in renames if target not in kept]
+    renames = [entry for entry in renames if entry[0] in kept]
+
+    # 削除は一度にまとめ、空いた名前にインスタンスをリネームする
+    if renames:
+        cmds.delete([target for target, _, _ in renames])
+    # 親付けに失敗して祖先の外に残ったインスタンスも片付ける
+    leftovers = cmds.ls(dropped) if dropped else []
+    if leftovers:
+        cmds.delete(leftovers)
+    created = [cmds.rename(inst, short_name) for _, inst, short_name in renames]
 
     if created:
         cmds.select(created, r=True)
@@ -72,31 +181,35 @@ def replace_with_first_instance(template=None, targets=None):
     return created
 
 
+@batch_edit
 def make_selected_unique(nodes=None):
     """Convert selected instances to unique copies by duplicating them."""
     nodes = nodes or cmds.ls(sl=True, type="transform", long=True) or []
     if not nodes:
         cmds.warning(u"インスタンスを解除する対象を選択してください。")
         return []
+    # 元ノードは最後にまとめて削除するため、親ごと消える子孫は先に除外する。
+    # ループ内で処理を飛ばす経路はないので、残した祖先は必ず削除される
+    nodes = _drop_descendants(cmds.ls(nodes, long=True) or [])
 
-    unique_nodes = []
+    renames = []
     for node in nodes:
-        if not cmds.objExists(node):
-            continue
-
-        parent = cmds.listRelatives(node, parent=True, fullPath=True)
-        matrix = cmds.xform(node, q=True, ws=True, m=True)
-        short_name = node.split("|")[-1]
+        parent = _parent_path(node)
+        short_name = _short_name(node)
 
         duplicate = cmds.duplicate(node, name=f"{short_name}_unique#", rr=True, rc=True)[0]
-        if parent:
-            duplicate = cmds.parent(duplicate, parent[0])[0]
-
-        cmds.xform(duplicate, ws=True, m=matrix)
-
-        cmds.delete(node)
-        duplicate = cmds.rename(duplicate, short_name)
-        unique_nodes.append(duplicate)
+        duplicate = cmds.ls(duplicate, long=True)[0]
+        # 複製は通常元と同じ親の下に作られるため、親が異なる場合だけ移動して位置を戻す
+        if _parent_path(duplicate) != parent:
+            matrix = cmds.xform(node, q=True, ws=True, m=True)
+            if parent:
+                duplicate = cmds.parent(duplicate, parent)[0]
+            cmds.xform(duplicate, ws=True, m=matrix)
+        renames.append((duplicate, short_name))
+
+    if nodes:
+        cmds.delete(nodes)
+    unique_nodes = [cmds.rename(duplicate, short_name) for duplicate, short_name in renames]
 
     if unique_nodes:
         cmds.select(unique_nodes, r=True)
@@ -104,6 +217,7 @@ def make_selected_unique(nodes=None):
     return unique_nodes
 
 
+@batch_edit
 def mirror_selected_instances(axis="x"):
     """Mirror selected instances.
 
@@ -167,12 +281,15 @@ def _mirror_via_runtime(selection):
         cmds.warning(u"CreateMirrorInstance の呼び出しに失敗したため、スクリプトによるミラー処理に切り替えます: %s" % exc)
         return None
 
-    after_nodes = set(cmds.ls(type="transform", long=True) or [])
-    created = [node for node in after_nodes - before_nodes if cmds.objExists(node)]
+    # ls が返すノードは存在が保証されているため objExists での再確認は不要
+    created = [
+        node for node in cmds.ls(type="transform", long=True) or [] if node not in before_nodes
+    ]
 
     if not created:
+        original = set(selection)
         new_selection = cmds.ls(sl=True, type="transform", long=True) or []
-        created = [node for node in new_selection if node not in selection and cmds.objExists(node)]
+        created = [node for node in new_selection if node not in original]
 
     return created
 
@@ -185,18 +302,19 @@ def _mirror_instances_manually(selection, axis="x"):
     processed = set()
     mirrored_nodes = []
 
+    # 選択は ls で、共有トランスフォームは listRelatives で得ており、
+    # ミラー処理中にノードが削除されることもないため存在確認は行わない
     for node in selection:
-        if node in processed or not cmds.objExists(node):
+        if node in processed:
             continue
 
         shared_transforms = _transforms_sharing_shapes(node)
-        shared_transforms = [n for n in shared_transforms if cmds.objExists(n)]
 
-        if shared_transforms and len(shared_transforms) > 1:
-            targets = [n for n in shared_transforms if n in selection_set]
+        if len(shared_transforms) > 1:
+            targets = shared_transforms & selection_set
             if targets:
                 for target in targets:
-                    if target in processed or not cmds.objExists(target):
+                    if target in processed:
                         continue
                     if _mirror_existing_transform(target, axis_key):
                         mirrored_nodes.append(target)
@@ -221,14 +339,14 @@ def _normalize_axis(axis):
 
 
 def _transforms_sharing_shapes(node):
-    """Return transforms that share shapes with *node*."""
+    """Return the set of transforms that share shapes with *node*."""
 
     transforms = {node}
     shapes = cmds.listRelatives(node, shapes=True, fullPath=True) or []
-    for shape in shapes:
-        parents = cmds.listRelatives(shape, parent=True, fullPath=True) or []
-        transforms.update(parents)
-    return list(transforms)
+    if shapes:
+        # 全シェイプの親は一度の listRelatives でまとめて取得する
+        transforms.update(cmds.listRelatives(shapes, parent=True, fullPath=True) or [])
+    return transforms
 
 
 def _create_mirrored_instance(node, axis):
@@ -244,11 +362,11 @@ def _create_mirrored_instance(node, axis):
         return None
 
     instance_node = result[0]
-    parent = cmds.listRelatives(node, parent=True, fullPath=True)
+    parent = _parent_path(node)
 
     if parent:
         try:
-            instance_node = cmds.parent(instance_node, parent[0])[0]
+            instance_node = cmds.parent(instance_node, parent)[0]
         except RuntimeError:
             pass
 
@@ -258,7 +376,7 @@ def _create_mirrored_instance(node, axis):
     except RuntimeError:
         pass
 
-    short_name = node.split("|")[-1]
+    short_name = _short_name(node)
     try:
         instance_node = cmds.rename(instance_node, f"{short_name}_mirror#")
     except RuntimeError:
@@ -281,31 +399,26 @@ def _mirror_existing_transform(node, axis):
 def _apply_negative_scale(node, axis, reference=None):
     """Set the scale on *node* so that the *axis* component is negative."""
 
-    axis_index = {"x": 0, "y": 1, "z": 2}[axis]
-    attr_names = [".scaleX", ".scaleY", ".scaleZ"]
-
-    source_node = reference if reference and cmds.objExists(reference) else node
+    axis_index = _AXIS_INDEX[axis]
 
-    values = []
-    for attr in attr_names:
-        try:
-            values.append(cmds.getAttr(source_node + attr))
-        except RuntimeError:
-            values.append(1.0)
+    source_node = reference or node
 
-    if not values:
-        return False
+    # スケールは compound 属性で一度に読み書きする
+    try:
+        values = list(cmds.getAttr(source_node + ".scale")[0])
+    except RuntimeError:
+        values = [1.0, 1.0, 1.0]
+    values[axis_index] = -abs(values[axis_index])
 
-    target_value = -abs(values[axis_index]) if values[axis_index] is not None else -1.0
+    try:
+        cmds.setAttr(node + ".scale", *values, type="double3")
+        return True
+    except RuntimeError:
+        pass
 
-    # Apply all three axes so that non-mirrored axes match the source.
+    # 一部の軸がロックされている場合は軸ごとに設定する
     success = True
-    for idx, attr in enumerate(attr_names):
-        if not cmds.objExists(node + attr):
-            continue
-        value = values[idx] if values[idx] is not None else 1.0
-        if idx == axis_index:
-            value = target_value
+    for attr, value in zip(_SCALE_ATTRS, values):
         try:
             cmds.setAttr(node + attr, value)
         except RuntimeError as exc:
@@ -321,11 +434,9 @@ def _filter_mesh_transforms(nodes):
 
     mesh_nodes = []
     skipped = []
-    for node in nodes:
-        if not cmds.objExists(node):
-            continue
-        shapes = cmds.listRelatives(node, shapes=True, fullPath=True) or []
-        has_mesh = any(cmds.nodeType(shape) == "mesh" for shape in shapes)
+    # 存在しないノードは ls でまとめて除外する
+    for node in cmds.ls(nodes, long=True) or []:
+        has_mesh = bool(cmds.listRelatives(node, shapes=True, type="mesh", fullPath=True))
         if has_mesh:
             mesh_nodes.append(node)
         else:
@@ -333,8 +444,15 @@ def _filter_mesh_transforms(nodes):
     return mesh_nodes, skipped
 
 
-def make_unique_combine_merge(nodes=None, merge_distance=0.001, delete_history=True):
-    """Make instances unique, combine them, merge vertices, and delete history."""
+@batch_edit
+def make_unique_combine_merge(
+    nodes=None, merge_distance=0.001, delete_history=True, skip_merge_if_single=False
+):
+    """Make instances unique, combine them, merge vertices, and delete history.
+
+    ``skip_merge_if_single`` skips the vertex merge when only one mesh was
+    given, assuming that mesh has no coincident vertices of its own.
+    """
 
     nodes = nodes or cmds.ls(sl=True, type="transform", long=True) or []
     if not nodes:
@@ -355,7 +473,7 @@ def make_unique_combine_merge(nodes=None, merge_distance=0.001, delete_history=T
         return None
 
     source_count = len(unique_nodes)
-    base_name = unique_nodes[0].split("|")[-1]
+    base_name = _short_name(unique_nodes[0])
     combined_node = unique_nodes[0]
 
     if source_count > 1:
@@ -381,7 +499,11 @@ def make_unique_combine_merge(nodes=None, merge_distance=0.001, delete_history=T
     except (TypeError, ValueError):
         merge_distance_value = 0.0
 
-    if merge_distance_value > 0 and cmds.objExists(combined_node):
+    if skip_merge_if_single and source_count == 1:
+        merge_distance_value = 0.0
+
+    # combined_node は存在確認済みのノードか polyUnite の結果で、以降の処理でも消えない
+    if merge_distance_value > 0:
         try:
             cmds.polyMergeVertex(
                 combined_node,
@@ -392,18 +514,18 @@ def make_unique_combine_merge(nodes=None, merge_distance=0.001, delete_history=T
         except RuntimeError as exc:
             cmds.warning(u"頂点マージに失敗しました: %s" % exc)
 
-    if delete_history and cmds.objExists(combined_node):
+    if delete_history:
         cmds.delete(combined_node, ch=True)
 
     if skipped:
-        short_names = ", ".join(node.split("|")[-1] for node in skipped)
+        short_names = ", ".join(_short_name(node) for node in skipped)
         cmds.warning(u"メッシュを持たないノードをスキップしました: %s" % short_names)
 
-    if cmds.objExists(combined_node):
-        cmds.select(combined_node, r=True)
+    cmds.select(combined_node, r=True)
 
     return combined_node, source_count
 
+@batch_edit
 def sort_selected_by_position(nodes=None, axis="auto", descending=False, space="world"):
     """Sort selected transforms in the Outliner based on their position.
 
@@ -419,8 +541,7 @@ def sort_selected_by_position(nodes=None, axis="auto", descending=False, space="
     """
 
     axis = (axis or "auto").lower()
-    axis_map = {"x": 0, "y": 1, "z": 2}
-    if axis not in axis_map and axis != "auto":
+    if axis not in _AXIS_INDEX and axis != "auto":
         cmds.error(u"axis には auto / x / y / z のいずれかを指定してください。")
         return []
 
@@ -436,7 +557,7 @@ def sort_selected_by_position(nodes=None, axis="auto", descending=False, space="
     use_world_space = space_normalized == "world"
 
     nodes = nodes or cmds.ls(sl=True, type="transform", long=True) or []
-    nodes = [node for node in nodes if cmds.objExists(node)]
+    nodes = cmds.ls(nodes, long=True) or []
     if len(nodes) < 2:
         if not nodes:
             cmds.warning(u"並べ替えるオブジェクトを選択してください。")
@@ -447,35 +568,44 @@ def sort_selected_by_position(nodes=None, axis="auto", descending=False, space="
     parent_groups = {}
     parent_order = []
     for node in nodes:
-        parent = cmds.listRelatives(node, parent=True, fullPath=True)
-        parent = parent[0] if parent else None
+        parent = _parent_path(node)
         if parent not in parent_groups:
             parent_groups[parent] = []
             parent_order.append(parent)
         parent_groups[parent].append(node)
 
+    # 並べ替え対象の親の子は一度の listRelatives でまとめて取得し、長い名前から親ごとに振り分ける
+    sortable = [parent for parent in parent_order if len(parent_groups[parent]) >= 2]
+    children_of = {parent: [] for parent in sortable}
+    if None in children_of:
+        children_of[None] = cmds.ls(assemblies=True, long=True) or []
+    sub_parents = [parent for parent in sortable if parent]
+    if sub_parents:
+        for child in cmds.listRelatives(
+            sub_parents, children=True, type="transform", fullPath=True
+        ) or []:
+            siblings = children_of.get(_parent_path(child))
+            if siblings is not None:
+                siblings.append(child)
+
     ordered_selection = []
     processed_count = 0
     epsilon = 1e-6
 
     def _choose_axis(data):
         if axis != "auto":
-            return axis_map[axis]
-        ranges = []
-        for idx in range(3):
-            coords = [pos[idx] for _, pos in data]
-            if coords:
-                axis_range = max(coords) - min(coords)
-            else:
-                axis_range = 0.0
-            ranges.append(axis_range)
-        max_range = max(ranges) if ranges else 0.0
+            return _AXIS_INDEX[axis]
+        if not data:
+            return None
+        # 軸ごとの座標列を zip でまとめて取り出し、範囲を一度に求める
+        ranges = [max(coords) - min(coords) for coords in zip(*(pos for _, pos in data))]
+        max_range = max(ranges)
         if max_range <= epsilon:
             return None
         return ranges.index(max_range)
 
     for parent in parent_order:
-        group = [node for node in parent_groups.get(parent, []) if cmds.objExists(node)]
+        group = parent_groups.get(parent, [])
         if len(group) < 2:
             ordered_selection.extend(group)
             continue
@@ -498,26 +628,26 @@ def sort_selected_by_position(nodes=None, axis="auto", descending=False, space="
             if axis_index is None:
                 sorted_nodes = sorted(group)
             else:
-                secondary_axes = [idx for idx in range(3) if idx != axis_index]
-
-                def _sort_key(item):
-                    pos = item[1]
-                    key_values = [round(pos[axis_index], 6)]
-                    key_values.extend(round(pos[idx], 6) for idx in secondary_axes)
-                    key_values.append(item[0])
-                    return tuple(key_values)
-
-                sorted_nodes = [item[0] for item in sorted(data, key=_sort_key)]
+                first, second, third = [axis_index] + [idx for idx in range(3) if idx != axis_index]
+                # キーはタプルとして一度だけ作り、そのまま比較させる
+                keyed = sorted(
+                    (round(pos[first], 6), round(pos[second], 6), round(pos[third], 6), node)
+                    for node, pos in data
+                )
+                sorted_nodes = [key[3] for key in keyed]
 
         if descending:
             sorted_nodes.reverse()
 
-        if parent:
-            children = cmds.listRelatives(parent, children=True, type="transform", fullPath=True) or []
-        else:
-            children = cmds.ls(assemblies=True, long=True) or []
+        children = children_of[parent]
 
         selected_set = set(group)
+        # 選択ノードが既に目的の順序で並んでいれば兄弟の再構築も reorder も不要
+        if [child for child in children if child in selected_set] == sorted_nodes:
+            ordered_selection.extend(sorted_nodes)
+            processed_count += len(sorted_nodes)
+            continue
+
         queue = list(sorted_nodes)
         final_order = []
         queue_index = 0
@@ -540,8 +670,14 @@ def sort_selected_by_position(nodes=None, axis="auto", descending=False, space="
             processed_count += len(sorted_nodes)
             continue
 
+        # 末尾のうち既に相対順序が正しい部分は動かさず、その手前だけを先頭へ送る
+        keep_from = len(final_order)
+        for child in reversed(children):
+            if keep_from and child == final_order[keep_from - 1]:
+                keep_from -= 1
+
         try:
-            for child in reversed(final_order):
+            for child in reversed(final_order[:keep_from]):
                 cmds.reorder(child, front=True)
         except RuntimeError:
             label = parent or u"ルート"